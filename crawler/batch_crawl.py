@@ -0,0 +1,136 @@
+"""Batch crawl of many FIDE IDs into database/fide_data.db, without the Streamlit UI.
+
+Usage:
+    python -m crawler.batch_crawl --ids-file ids.txt --start 2020-01-01 --end 2024-12-01
+    python -m crawler.batch_crawl --federation Brazil --start 2023-01-01 --end 2023-12-01 --workers 8
+    python -m crawler.batch_crawl --opponents --start 2023-01-01 --end 2023-12-01
+"""
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from database.database_management import initialize_database, get_period_coverage, record_period_coverage, upsert_player_data
+from database.connection import DB_PATH, get_database
+from database.ingest_writer import get_ingest_writer
+from data_processing.data_fetching_processing import loadStoredPlayerData, scrapePlayerData, scrapeRatingPeriods, buildRatingPeriods, periodsToSync, insertGameData
+from data_processing.rate_limiter import get_rate_limiter
+
+# Jogadores processados em paralelo e periodos em paralelo por jogador
+DEFAULT_WORKERS = 4
+PERIODS_PER_PLAYER = 4
+
+def read_ids_file(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+def ids_by_federation(cursor, federation):
+    # Aceita o codigo da lista de rating (BRA) ou o nome exibido no perfil (Brazil)
+    cursor.execute("SELECT fide_id FROM player_data WHERE federation_code = ? COLLATE NOCASE OR federation = ? COLLATE NOCASE ORDER BY fide_id", (federation, federation))
+    return [row[0] for row in cursor.fetchall()]
+
+def ids_of_stored_opponents(cursor):
+    # Oponentes presentes nas partidas salvas e que ainda nao tem partidas proprias no banco
+    cursor.execute('''
+    SELECT p.fide_id
+    FROM players p
+    WHERE p.fide_id IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM games WHERE white_id = p.id AND white_seen = 1)
+      AND NOT EXISTS (SELECT 1 FROM games WHERE black_id = p.id AND black_seen = 1)
+    ORDER BY p.fide_id
+    ''')
+    return [row[0] for row in cursor.fetchall()]
+
+def crawl_player(fide_id, periods, rating_type='std', base_url=None):
+    """Network and parsing work for one player; runs on a worker thread and never touches the DB."""
+    # Perfil salvo dentro do TTL e reaproveitado; senao e raspado aqui e gravado pela thread escritora
+    player_data, stale = loadStoredPlayerData(fide_id)
+    if player_data is None or stale:
+        scraped_player_data = scrapePlayerData(fide_id, base_url)
+        # Perfil nao lido (FIDE fora do ar): o salvo, mesmo velho, continua valendo
+        if scraped_player_data['name'] or player_data is None:
+            player_data = scraped_player_data
+    games_df, period_outcomes = scrapeRatingPeriods(fide_id, player_data.get('name', ''), periods, max_workers=PERIODS_PER_PLAYER, base_url=base_url, rating_type=rating_type)
+    return player_data, games_df, period_outcomes
+
+def store_crawl_result(cursor, fide_id, rating_type, result):
+    player_data, games_df, period_outcomes = result
+    # Perfis lidos do banco ja tem fetched_at e nao precisam ser regravados; perfis sem nome nao foram lidos
+    if 'fetched_at' not in player_data and player_data['name']:
+        upsert_player_data(cursor, player_data)
+    insertGameData(cursor, games_df, fide_id, rating_type)
+    record_period_coverage(cursor, fide_id, rating_type, period_outcomes)
+
+def batch_crawl(fide_ids, startingPeriod, endPeriod, workers=DEFAULT_WORKERS, rating_type='std', base_url=None, report_every=10):
+    """Crawls every player through a thread pool; results are written by the process-wide ingest writer."""
+    periods = buildRatingPeriods(startingPeriod, endPeriod)
+    stats = {'players': 0, 'failed': 0, 'pages': 0, 'games': 0}
+    started = time.monotonic()
+
+    def report():
+        elapsed = max(time.monotonic() - started, 1e-9)
+        limiter = get_rate_limiter().stats()
+        print(f"{stats['players']}/{len(fide_ids)} jogadores, {stats['failed']} falhas, {stats['games']} partidas | "
+              f"{stats['players'] / elapsed * 60:.1f} jogadores/min, {stats['pages'] / elapsed:.1f} paginas/s, "
+              f"{limiter['requests']} requisicoes, {limiter['wait_seconds']:.1f}s de espera no limitador")
+
+    reader = get_database(DB_PATH).reader().cursor()
+    writer = get_ingest_writer(DB_PATH)
+    writes = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {}
+        for fide_id in fide_ids:
+            missing = periodsToSync(periods, get_period_coverage(reader, fide_id, rating_type))
+            if not missing:
+                stats['players'] += 1
+                continue
+            futures[executor.submit(crawl_player, fide_id, missing, rating_type, base_url)] = (fide_id, missing)
+
+        for future in as_completed(futures):
+            fide_id, missing = futures[future]
+            stats['players'] += 1
+            try:
+                result = future.result()
+            except Exception as e:
+                stats['failed'] += 1
+                print(f"Falha ao processar {fide_id}: {e}")
+                continue
+            # Sem esperar a gravacao: a thread escritora junta varios jogadores por transacao
+            writes.append((fide_id, writer.submit(store_crawl_result, fide_id, rating_type, result)))
+            stats['pages'] += len(missing)
+            stats['games'] += len(result[1])
+            if stats['players'] % report_every == 0:
+                report()
+
+    for fide_id, write in writes:
+        try:
+            write.result()
+        except Exception as e:
+            stats['failed'] += 1
+            print(f"Falha ao gravar {fide_id}: {e}")
+    report()
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description='Crawl FIDE game histories for many players')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--ids-file', help='File with one FIDE ID per line')
+    source.add_argument('--federation', help='Every player of this federation already in player_data, by code (BRA) or name (Brazil)')
+    source.add_argument('--opponents', action='store_true', help='Opponents found in stored games that were never crawled')
+    parser.add_argument('--start', required=True, help='First rating period, YYYY-MM-DD')
+    parser.add_argument('--end', required=True, help='Last rating period, YYYY-MM-DD')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--rating-type', choices=['std', 'rapid', 'blitz'], default='std')
+    parser.add_argument('--base-url', help='Override ratings.fide.com, e.g. the offline stand-in server')
+    args = parser.parse_args()
+
+    initialize_database()
+    if args.ids_file:
+        fide_ids = read_ids_file(args.ids_file)
+    else:
+        cursor = get_database(DB_PATH).reader().cursor()
+        fide_ids = ids_by_federation(cursor, args.federation) if args.federation else ids_of_stored_opponents(cursor)
+
+    print(f"{len(fide_ids)} jogadores para processar")
+    batch_crawl(fide_ids, args.start, args.end, args.workers, args.rating_type, args.base_url)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""Breadth-first crawl through the opponents found in stored games, starting from seed players.
+
+The frontier and visited set live in SQLite (crawl_frontier), so an interrupted crawl resumes
+where it stopped when started again.
+
+Usage:
+    python -m crawler.opponent_graph --seed 2093596 --start 2023-01-01 --end 2023-12-01 --max-depth 2 --max-players 500
+    python -m crawler.opponent_graph --resume --start 2023-01-01 --end 2023-12-01
+"""
+import time
+import argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from database.database_management import initialize_database, get_period_coverage
+from database.connection import DB_PATH, get_database
+from database.ingest_writer import get_ingest_writer
+from data_processing.data_fetching_processing import buildRatingPeriods, periodsToSync
+from crawler.batch_crawl import DEFAULT_WORKERS, crawl_player, store_crawl_result
+
+# Como ordenar jogadores da mesma profundidade na fronteira
+PRIORITY_MODES = ('rating', 'games', 'none')
+
+def ensure_frontier_tables(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS crawl_frontier (
+        fide_id TEXT PRIMARY KEY,
+        depth INTEGER NOT NULL,
+        priority REAL NOT NULL DEFAULT 0,
+        status TEXT NOT NULL DEFAULT 'pending',
+        discovered_from TEXT,
+        discovered_at TEXT NOT NULL,
+        crawled_at TEXT
+    );
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_crawl_frontier_next ON crawl_frontier(status, depth, priority DESC);")
+
+def add_seeds(cursor, fide_ids):
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    cursor.executemany(
+        "INSERT OR IGNORE INTO crawl_frontier (fide_id, depth, priority, discovered_at) VALUES (?, 0, 0, ?)",
+        [(fide_id, now) for fide_id in fide_ids]
+    )
+
+def discover_opponents(cursor, fide_id):
+    """Returns [(opponent_fide_id, best_rating, game_count)] for the opponents of a crawled player.
+
+    Opponents known only by name (no profile link and an ambiguous name) are left out.
+    """
+    cursor.execute('''
+    SELECT opponent_fide_id, MAX(opponent_rating), COUNT(*)
+    FROM game_history
+    WHERE fide_id = ? AND opponent_fide_id IS NOT NULL AND opponent_fide_id != ?
+    GROUP BY opponent_fide_id
+    ''', (fide_id, fide_id))
+    return [(opponent_id, rating or 0, games) for opponent_id, rating, games in cursor.fetchall()]
+
+def push_opponents(cursor, fide_id, depth, opponents, priority_mode):
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    if priority_mode == 'rating':
+        rows = [(opponent_id, depth, rating, fide_id, now) for opponent_id, rating, _ in opponents]
+        merge = "MAX(priority, excluded.priority)"
+    elif priority_mode == 'games':
+        rows = [(opponent_id, depth, games, fide_id, now) for opponent_id, _, games in opponents]
+        merge = "priority + excluded.priority"
+    else:
+        rows = [(opponent_id, depth, 0, fide_id, now) for opponent_id, _, _ in opponents]
+        merge = "priority"
+    # Jogadores ja visitados nao voltam para a fronteira; pendentes ficam com a menor profundidade
+    cursor.executemany(f'''
+    INSERT INTO crawl_frontier (fide_id, depth, priority, discovered_from, discovered_at) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(fide_id) DO UPDATE SET
+        depth = MIN(depth, excluded.depth),
+        priority = {merge}
+    WHERE status = 'pending'
+    ''', rows)
+
+def next_batch(cursor, max_depth, size):
+    cursor.execute('''
+    SELECT fide_id, depth FROM crawl_frontier
+    WHERE status = 'pending' AND depth <= ?
+    ORDER BY depth, priority DESC
+    LIMIT ?
+    ''', (max_depth, size))
+    return cursor.fetchall()
+
+def mark_crawled(cursor, fide_id, status):
+    cursor.execute("UPDATE crawl_frontier SET status = ?, crawled_at = ? WHERE fide_id = ?",
+                   (status, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), fide_id))
+
+def record_crawl(cursor, fide_id, depth, result, max_depth, rating_type, priority_mode):
+    # Partidas, oponentes descobertos e status do jogador gravados juntos
+    if result is not None:
+        store_crawl_result(cursor, fide_id, rating_type, result)
+    if depth < max_depth:
+        push_opponents(cursor, fide_id, depth + 1, discover_opponents(cursor, fide_id), priority_mode)
+    mark_crawled(cursor, fide_id, 'done')
+
+def crawl_opponent_graph(seeds, startingPeriod, endPeriod, max_depth=2, max_players=1000, priority_mode='rating', workers=DEFAULT_WORKERS, rating_type='std', base_url=None):
+    """Expands the frontier breadth-first until it is empty, max_depth is exhausted or max_players were crawled."""
+    periods = buildRatingPeriods(startingPeriod, endPeriod)
+    crawled = 0
+    started = time.monotonic()
+
+    database = get_database(DB_PATH)
+    with database.transaction() as cursor:
+        ensure_frontier_tables(cursor)
+        add_seeds(cursor, seeds)
+    reader = database.reader().cursor()
+    writer = get_ingest_writer(DB_PATH)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        while crawled < max_players:
+            batch = next_batch(reader, max_depth, min(workers * 2, max_players - crawled))
+            if not batch:
+                break
+
+            futures = []
+            for fide_id, depth in batch:
+                missing = periodsToSync(periods, get_period_coverage(reader, fide_id, rating_type))
+                future = executor.submit(crawl_player, fide_id, missing, rating_type, base_url) if missing else None
+                futures.append((fide_id, depth, future))
+
+            writes = []
+            for fide_id, depth, future in futures:
+                crawled += 1
+                try:
+                    result = future.result() if future is not None else None
+                except Exception as e:
+                    print(f"Falha ao processar {fide_id}: {e}")
+                    writes.append((fide_id, writer.submit(mark_crawled, fide_id, 'failed')))
+                    continue
+                writes.append((fide_id, writer.submit(record_crawl, fide_id, depth, result, max_depth, rating_type, priority_mode)))
+            # O proximo lote da fronteira so pode ser lido depois que este foi gravado
+            for fide_id, write in writes:
+                try:
+                    write.result()
+                except Exception as e:
+                    print(f"Falha ao gravar {fide_id}: {e}")
+                    writer.write(mark_crawled, fide_id, 'failed')
+
+            pending, = reader.execute("SELECT COUNT(*) FROM crawl_frontier WHERE status = 'pending' AND depth <= ?", (max_depth,)).fetchone()
+            elapsed = max(time.monotonic() - started, 1e-9)
+            print(f"{crawled} jogadores processados, {pending} na fronteira, {crawled / elapsed * 60:.1f} jogadores/min")
+
+    return crawled
+
+def main():
+    parser = argparse.ArgumentParser(description='Breadth-first crawl through opponents of seed players')
+    parser.add_argument('--seed', action='append', default=[], help='Seed FIDE ID (repeatable)')
+    parser.add_argument('--resume', action='store_true', help='Continue the persisted frontier without new seeds')
+    parser.add_argument('--reset', action='store_true', help='Forget the persisted frontier before starting')
+    parser.add_argument('--start', required=True, help='First rating period, YYYY-MM-DD')
+    parser.add_argument('--end', required=True, help='Last rating period, YYYY-MM-DD')
+    parser.add_argument('--max-depth', type=int, default=2)
+    parser.add_argument('--max-players', type=int, default=1000)
+    parser.add_argument('--priority', choices=PRIORITY_MODES, default='rating')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--rating-type', choices=['std', 'rapid', 'blitz'], default='std')
+    parser.add_argument('--base-url', help='Override ratings.fide.com, e.g. the offline stand-in server')
+    args = parser.parse_args()
+
+    if not args.seed and not args.resume:
+        parser.error('informe --seed ou --resume')
+
+    initialize_database()
+    if args.reset:
+        with get_database(DB_PATH).transaction() as cursor:
+            cursor.execute("DROP TABLE IF EXISTS crawl_frontier")
+
+    crawl_opponent_graph(args.seed, args.start, args.end, args.max_depth, args.max_players, args.priority, args.workers, args.rating_type, args.base_url)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+import re
+from io import BytesIO
+from collections import deque, namedtuple
+from lxml import etree
+
+GameRecord = namedtuple('GameRecord', ['date', 'tournament_name', 'country', 'player_name', 'player_rating', 'player_color', 'opponent_name', 'opponent_rating', 'result', 'chg', 'k', 'k_chg', 'opponent_fide_id'])
+
+# Mesma normalizacao de espacos aplicada pelo pd.read_html
+_WHITESPACE = re.compile(r"[\r\n]+|\s{2,}")
+
+# O nome do oponente e um link para o perfil dele: /profile/<FIDE ID>
+_PROFILE_LINK = re.compile(r'/profile/(\d+)')
+
+# Linhas de cabecalho de cada torneio: nome/data, titulos das colunas e rating do jogador
+_HEADER_ROWS = 3
+
+def _cell_text(cell):
+    text = _WHITESPACE.sub(" ", "".join(cell.itertext())).strip()
+    return text if text else None
+
+def _read_row(tr):
+    cells = []
+    color = None
+    opponent_id = None
+    only_th = True
+    for cell in tr:
+        if cell.tag not in ('td', 'th'):
+            continue
+        if cell.tag == 'td':
+            only_th = False
+        first_cell = not cells
+        text = _cell_text(cell)
+        # pd.read_html repete o texto das celulas com colspan
+        try:
+            span = max(1, int(cell.get('colspan', 1)))
+        except ValueError:
+            span = 1
+        cells.extend([text] * span)
+        if color is None:
+            for img in cell.iter('img'):
+                color = 'white' if 'clr_wh' in (img.get('src') or '') else 'black'
+                break
+        if first_cell:
+            for link in cell.iter('a'):
+                match = _PROFILE_LINK.search(link.get('href') or '')
+                if match:
+                    opponent_id = match.group(1)
+                    break
+    return cells, color, opponent_id, only_th
+
+def _cell(cells, index):
+    return cells[index] if index < len(cells) else None
+
+def _game_record(cells, color, opponent_id, tournament, playerName):
+    tournament_name, tournament_date, player_rating = tournament
+    values = (_cell(cells, 0), _cell(cells, 3), _cell(cells, 4), _cell(cells, 5), _cell(cells, 7), _cell(cells, 8), _cell(cells, 9))
+    if None in values or None in tournament or color is None:
+        return None
+    opponent_name, opponent_rating, country, result, chg, k, k_chg = values
+    try:
+        result = float(result)
+    except ValueError:
+        return None
+    return GameRecord(tournament_date, tournament_name, country, playerName, player_rating, color, opponent_name, opponent_rating, result, chg, k, k_chg, opponent_id)
+
+def _in_calc_table(tr):
+    parent = tr.getparent()
+    while parent is not None and parent.tag != 'table':
+        parent = parent.getparent()
+    return parent is not None and 'calc_table' in (parent.get('class') or '').split()
+
+def parseCalcTable(html, playerName):
+    """Parses the calc_table of an a_indv_calculations.php page into GameRecords in a single pass."""
+    # As paginas da FIDE sao UTF-8 (texto ou bytes); sem o encoding explicito o lxml leria como latin-1
+    data = html.encode('utf-8') if isinstance(html, str) else html
+    records = []
+    tournament = None
+    # As ultimas linhas ainda nao podem ser atribuidas: podem ser o cabecalho do proximo torneio
+    pending = deque()
+    seen_data_row = False
+
+    for _, tr in etree.iterparse(BytesIO(data), events=('end',), tag='tr', html=True, recover=True, encoding='utf-8'):
+        if not _in_calc_table(tr):
+            continue
+        cells, color, opponent_id, only_th = _read_row(tr)
+        tr.clear()
+
+        if only_th and not seen_data_row:
+            continue
+        seen_data_row = True
+
+        first = _cell(cells, 0) or ''
+        if first.startswith('*') and 'Rating difference of more than 400' in first:
+            continue
+
+        if all(cell is None for cell in cells):
+            # Linha separadora: as 3 linhas anteriores descrevem o novo torneio
+            if len(pending) >= _HEADER_ROWS:
+                while len(pending) > _HEADER_ROWS:
+                    _flush(pending.popleft(), tournament, playerName, records)
+                header, _, rating_row = pending
+                tournament = (_cell(header[0], 0), _cell(header[0], 7), _cell(rating_row[0], 1))
+            pending.clear()
+            continue
+
+        pending.append((cells, color, opponent_id))
+        if len(pending) > _HEADER_ROWS:
+            _flush(pending.popleft(), tournament, playerName, records)
+
+    for row in pending:
+        _flush(row, tournament, playerName, records)
+
+    return records
+
+def _flush(row, tournament, playerName, records):
+    if tournament is None:
+        return
+    record = _game_record(row[0], row[1], row[2], tournament, playerName)
+    if record is not None:
+        records.append(record)
@@ -1,22 +1,74 @@
 import streamlit as st
 import pandas as pd
-import requests
 from bs4 import BeautifulSoup
+from requests import RequestException
 from datetime import datetime
 from dateutil import relativedelta
 import re
-import sqlite3
-
-def insertGameData(cursor, games_df, fide_id):
-    if not games_df.empty:
-        for index, row in games_df.iterrows():
-            cursor.execute("INSERT INTO game_history (fide_id, date, tournament_name, country, player_name, player_rating, player_color, opponent_name, opponent_rating, result, chg, k, k_chg) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", 
-                           (fide_id, row['date'], row['tournament_name'], row['country'], row['player_name'], row['player_rating'], row['player_color'], row['opponent_name'], row['opponent_rating'], row['result'], row['chg'], row['k'], row['k_chg']))
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from data_processing.http_client import http_get
+from data_processing.html_cache import get_html_cache, ratingPeriodTtl, isOpenRatingPeriod, OPEN_PERIOD_TTL
+from data_processing.calc_table_parser import parseCalcTable
+from data_processing.profile_parser import parseProfilePage
+from data_processing.player_index import get_player_index
+from data_processing.single_flight import get_single_flight
+from database.database_management import get_period_coverage, record_period_coverage, upsert_player_data, get_player_data, to_int, to_real, to_iso_date, to_fide_id
+from database.game_store import store_games
+from database.connection import read_connection
+from database.ingest_writer import get_ingest_writer
+from database.photo_store import get_profile_photo
+
+# URLs base dos servidores da FIDE; podem apontar para o servidor local de testes (offline_server)
+FIDE_BASE_URL = os.environ.get('FIDE_BASE_URL', 'https://fide.com')
+FIDE_RATINGS_BASE_URL = os.environ.get('FIDE_RATINGS_BASE_URL', 'https://ratings.fide.com')
+
+# Tempo (segundos) em que um perfil salvo e servido sem consultar a FIDE
+PROFILE_TTL = int(os.environ.get('FIDE_PROFILE_TTL', 24 * 60 * 60))
+
+_profile_refreshes = set()
+_profile_refreshes_lock = threading.Lock()
+
+def gameRows(games):
+    # Aceita o DataFrame de scrapeRatingPeriods ou uma lista de GameRecord; a conversao para
+    # os tipos das colunas e feita uma unica vez, aqui
+    if isinstance(games, pd.DataFrame):
+        if games.empty:
+            return []
+        # Historicos lidos do banco antigo podem nao ter o ID do oponente
+        games = zip(*(games[column].tolist() if column in games else [None] * len(games) for column in GAME_HISTORY_COLUMNS))
+    return [
+        (to_iso_date(date), tournament_name, country, player_name, to_int(player_rating), player_color,
+         opponent_name, to_int(opponent_rating), to_real(result), to_real(chg), to_int(k), to_real(k_chg),
+         to_fide_id(opponent_fide_id))
+        for date, tournament_name, country, player_name, player_rating, player_color, opponent_name, opponent_rating, result, chg, k, k_chg, opponent_fide_id in games
+    ]
+
+def insertGameData(cursor, games, fide_id, rating_type='std'):
+    """Writes a whole DataFrame or record batch into the normalized games tables; the caller commits once."""
+    rows = gameRows(games)
+    if rows:
+        store_games(cursor, fide_id, rows, rating_type)
+
+def fetch_players(query, base_url=None):
+    # Buscar primeiro no indice local de player_data; a busca da FIDE so e usada quando nada e encontrado
+    players = [{
+        'name': name,
+        'title': title if title else "Sem título",
+        'url': f'{FIDE_RATINGS_BASE_URL}/profile/{fide_id}',
+        'id': fide_id,
+    } for _, fide_id, name, title, _ in get_player_index().search(query)]
+    if players:
+        return players
+    return fetch_players_remote(query, base_url)
 
 @st.cache(allow_output_mutation=True)    
-def fetch_players(query):
+def fetch_players_remote(query, base_url=None):
+    base_url = base_url or FIDE_BASE_URL
+
     # Definir a URL para a consulta de pesquisa
-    url = "https://fide.com/search"
+    url = f"{base_url}/search"
 
     # Cabeçalhos com base nas informações fornecidas
     headers = {
@@ -24,8 +76,8 @@ def fetch_players(query):
         'Accept-Encoding': 'gzip, deflate, br',
         'Accept-Language': 'en-US,en;q=0.9,pt-BR;q=0.8,pt;q=0.7',
         'Content-Type': 'application/json',
-        'Origin': 'https://fide.com',
-        'Referer': f'https://fide.com/search?query={query}',
+        'Origin': base_url,
+        'Referer': f'{base_url}/search?query={query}',
         'Sec-Fetch-Dest': 'empty',
         'Sec-Fetch-Mode': 'cors',
         'Sec-Fetch-Site': 'same-site',
@@ -35,16 +87,20 @@ def fetch_players(query):
     # Os parâmetros da consulta
     params = {'query': query}
 
+    # Inicializar uma lista para armazenar informações do jogador
+    players = []
+
     # Fazer a requisição GET
-    response = requests.get(url, headers=headers, params=params)
+    try:
+        response = http_get(url, headers=headers, params=params)
+    except RequestException as e:
+        print(f"Falha ao recuperar dados: {e}")
+        return players
 
     # Verificar se a requisição foi bem-sucedida
     if response.status_code == 200:
         soup = BeautifulSoup(response.content, 'html.parser')
         search_blocks = soup.find_all('div', class_='member-block')
-    
-        # Inicializar uma lista para armazenar informações do jogador
-        players = []
 
         for block in search_blocks:
             player_entries = block.find_all(class_="member-block__one")
@@ -77,49 +133,81 @@ def fetch_players(query):
 
     return players
 
-def safe_extract(callable, default=''):
-    """Safely executes a callable for BeautifulSoup extraction and handles exceptions."""
+def scrapePlayerData(fide_id, base_url=None):
+    base_url = base_url or FIDE_RATINGS_BASE_URL
+    url = f'{base_url}/profile/{fide_id}'
     try:
-        return callable()
-    except Exception:
-        return default
-    
-def scrapePlayerData(fide_id):
-    url = f'https://ratings.fide.com/profile/{fide_id}'
-    html = requests.get(url).text
-    soup = BeautifulSoup(html, 'html.parser')
-
-    player_data = {'fide_id': fide_id}  # Include the fide_id in the player_data
-
-    # Use the safe_extract function for each piece of data to handle potential exceptions
-    player_data['name'] = safe_extract(lambda: soup.find('div', class_='profile-top-title').text.strip())
-    player_data['world_rank'] = safe_extract(lambda: soup.find('div', text='World Rank (Active):').find_next_sibling('div').text)
-    player_data['federation'] = safe_extract(lambda: soup.find('div', text='Federation:').find_next_sibling('div').text)
-    player_data['b_year'] = safe_extract(lambda: soup.find('div', text='B-Year:').find_next_sibling('div').text)
-    player_data['sex'] = safe_extract(lambda: soup.find('div', text='Sex:').find_next_sibling('div').text)
-    player_data['fide_title'] = safe_extract(lambda: soup.find('div', text='FIDE title:').find_next_sibling('div').text)
-
-    # Handling profile photo separately due to the nested structure
-    def get_profile_photo():
-        profile_photo_div = soup.find('div', class_='profile-top__photo')
-        img_tag = profile_photo_div.find('img') if profile_photo_div else None
-        return img_tag['src'] if img_tag else None
-    player_data['profile_photo'] = safe_extract(get_profile_photo)
-
-    # Extracting rating info
-    ratings = soup.select('.profile-top-rating-data')
-    for rating in ratings:
-        rating_type = safe_extract(lambda: rating.find('span').text.strip().lower())
-        rating_value = safe_extract(lambda: ''.join(filter(str.isdigit, rating.text)))
-        player_data[f'{rating_type}_rating'] = rating_value
-
+        html = http_get(url).text
+    except RequestException as e:
+        # FIDE fora do ar: perfil sem nome, como um jogador nao encontrado; a proxima visita tenta de novo
+        print(f"Falha ao recuperar o perfil de {fide_id}: {e}")
+        html = ''
+    return parseProfilePage(html, fide_id)
+
+def storePlayerData(player_data):
+    get_ingest_writer().write(upsert_player_data, player_data)
+
+def loadStoredPlayerData(fide_id):
+    """Returns (stored profile or None, True if it is older than PROFILE_TTL)."""
+    stored = get_player_data(read_connection().cursor(), fide_id)
+    # Jogadores vindos so da lista de ratings nunca tiveram o perfil raspado (sem foto/ranking)
+    if stored is None or 'fetched_at' not in stored:
+        return None, True
+    age = (datetime.now() - datetime.strptime(stored['fetched_at'], "%Y-%m-%d %H:%M:%S")).total_seconds()
+    return stored, age > PROFILE_TTL
+
+def refreshPlayerDataInBackground(fide_id, base_url=None):
+    with _profile_refreshes_lock:
+        if fide_id in _profile_refreshes:
+            return
+        _profile_refreshes.add(fide_id)
+
+    def refresh():
+        try:
+            get_single_flight().do(('profile', str(fide_id)), lambda progress: syncPlayerData(fide_id, base_url))
+        except Exception as e:
+            print(f"Falha ao atualizar o perfil de {fide_id}: {e}")
+        finally:
+            with _profile_refreshes_lock:
+                _profile_refreshes.discard(fide_id)
+
+    threading.Thread(target=refresh, daemon=True).start()
+
+def syncPlayerData(fide_id, base_url=None):
+    player_data = scrapePlayerData(fide_id, base_url)
+    # Perfil nao lido nao e gravado: nao substitui o salvo nem fica no cache ate o fim do PROFILE_TTL
+    if player_data['name']:
+        storePlayerData(player_data)
     return player_data
 
-def fetch_player_data(fide_id):
-    fetched_player_data = scrapePlayerData(fide_id)
-    return fetched_player_data
+def fetch_player_data(fide_id, base_url=None):
+    # Perfil conhecido: responder do banco e, se estiver velho, atualizar em segundo plano
+    stored_player_data, stale = loadStoredPlayerData(fide_id)
+    if stored_player_data is not None:
+        if stale:
+            refreshPlayerDataInBackground(fide_id, base_url)
+        return stored_player_data
+
+    # Varias sessoes abrindo o mesmo jogador: so uma raspa o perfil, as outras esperam por ele
+    fetched_player_data = get_single_flight().do(('profile', str(fide_id)), lambda progress: syncPlayerData(fide_id, base_url))
+    stored_player_data, _ = loadStoredPlayerData(fide_id)
+    return stored_player_data or fetched_player_data
+
+def fetch_profile_photo(player_data):
+    """Returns the thumbnail bytes for a profile, or None when there is no stored photo."""
+    if not player_data or not player_data.get('photo_hash'):
+        return None
+    return get_profile_photo(read_connection().cursor(), player_data['photo_hash'])
+
+GAME_HISTORY_COLUMNS = ['date', 'tournament_name', 'country', 'player_name', 'player_rating', 'player_color', 'opponent_name', 'opponent_rating', 'result', 'chg', 'k', 'k_chg', 'opponent_fide_id']
+
+# Numero maximo de periodos de rating baixados em paralelo
+MAX_CONCURRENT_PERIODS = 8
 
-def scrapePlayerGamesHistory(fide_id, playerName, startingPeriod, endPeriod, progress_bar=None):
+# Valor do parametro t de a_indv_calculations.php para cada tipo de rating
+RATING_TYPE_CODES = {'std': 0, 'rapid': 1, 'blitz': 2}
+
+def buildRatingPeriods(startingPeriod, endPeriod):
     startingPeriodDate = datetime.strptime(startingPeriod, "%Y-%m-%d")
     endPeriodDate = datetime.strptime(endPeriod, "%Y-%m-%d")
     walkingDate = startingPeriodDate
@@ -130,131 +218,150 @@ def scrapePlayerGamesHistory(fide_id, playerName, startingPeriod, endPeriod, pro
         fullDateRange.append(firstDayOfMonth.strftime("%Y-%m-%d"))
         walkingDate = walkingDate + relativedelta.relativedelta(months=1)
 
-    # Colunas atualizadas do DataFrame para refletir detalhes do jogo
-    gameDf = pd.DataFrame(columns=['date', 'tournament_name', 'country', 'player_name', 'player_rating', 'player_color', 'opponent_name', 'opponent_rating', 'result', 'chg', 'k', 'k_chg'])
-
-    allLinks = []
-    for stringDate in fullDateRange:
-        allLinks.append(f"https://ratings.fide.com/a_indv_calculations.php?id_number={fide_id}&rating_period={stringDate}&t=0")
-
-    for index, link in enumerate(allLinks):
-        # Update progress bar if it's passed as an argument
-        if progress_bar is not None:
-            progress_bar.progress((index + 1) / len(allLinks))
-        
-        try:
-            
-            html = requests.get(link).text
-            parsed_html = BeautifulSoup(html, 'html.parser')
-            fullTable = parsed_html.find('table', attrs={'class': 'calc_table'})
-            if fullTable is not None:
-                tableDf = pd.read_html(fullTable.prettify())[0]
-                tableDf.drop(tableDf.index[tableDf['Unnamed: 0'] == "*  Rating difference of more than 400."], inplace=True)
-                tableDf.reset_index(inplace=True, drop=True)
-                limiters = tableDf.isnull().all(1)
-                limiters = limiters[limiters == True].index.values.tolist()
-                colors = fullTable.find_all('img')
-                retrievedColors = []
-                
-                for img_tag in colors:
-                    src = img_tag.get('src')
-                    color = 'white' if 'clr_wh' in src else 'black'
-                    retrievedColors.append(color)
-                
-                colorIndex = 0
-                
-                for limiter in limiters:
-                    tournament_name = tableDf.iloc[limiter - 3, 0]
-                    tournament_date = tableDf.iloc[limiter - 3, 7]
-                    player_rating = tableDf.iloc[limiter - 1, 1]
-                    if limiters.index(limiter) < len(limiters) - 1:
-                        localDf = tableDf.iloc[limiter + 1:limiters[limiters.index(limiter) + 1] - 3, :]
-                    else:
-                        localDf = tableDf.iloc[limiter + 1:, :]
-                    
-                    # Iterar sobre cada jogo no torneio
-                    for _, row in localDf.iterrows():
-                        game_details = {
-                            'date': tournament_date,
-                            'tournament_name': tournament_name,
-                            'country': row['Unnamed: 4'],
-                            'player_name': playerName,
-                            'player_rating': player_rating,
-                            'player_color': retrievedColors[colorIndex],
-                            'opponent_name': row['Unnamed: 0'],  
-                            'opponent_rating': row['Unnamed: 3'],  
-                            'result': float(row['Unnamed: 5']), 
-                            'chg': row['Unnamed: 7'], 
-                            'k': row['Unnamed: 8'], 
-                            'k_chg': row['Unnamed: 9'], 
-                        }
-                        gameDf = pd.concat([gameDf, pd.DataFrame([game_details])], ignore_index=True)
-                        gameDf.dropna(inplace=True)
-                        gameDf.reset_index(inplace=True, drop=True)
-                        colorIndex += 1
-        except:
-            pass
-                
-    
-    if len(gameDf) > 0:
-        gameDf['opponent_rating'] = gameDf['opponent_rating'].astype(str).str.replace(r'\D', '', regex=True)
-        gameDf['opponent_rating'] = pd.to_numeric(gameDf['opponent_rating'], errors='coerce')
-        gameDf['result'] = gameDf['result'].astype(float)
+    return fullDateRange
+
+def fetchRatingPeriodPage(link):
+    # Periodos fechados nunca mudam: servir do cache em disco sempre que possivel
+    cache = get_html_cache()
+    html = cache.get(link)
+    if html is None:
+        response = http_get(link)
+        # Pagina de erro (403, 404...) nao e um periodo vazio: o registro de cobertura precisa ver 'error'
+        if response.status_code != 200:
+            raise RequestException(f"HTTP {response.status_code} em {link}", response=response)
+        html = response.text
+        cache.put(link, html, ttl=ratingPeriodTtl(link))
+    return html
+
+def parseRatingPeriodPage(html, playerName):
+    # Erros de parse sobem para scrapeRatingPeriods, que marca o periodo como 'error'
+    return parseCalcTable(html, playerName)
+
+def newGameColumns():
+    # Acumulador colunar: uma lista por coluna, convertida em DataFrame uma unica vez
+    return {column: [] for column in GAME_HISTORY_COLUMNS}
+
+def appendGameRecords(gameColumns, records):
+    if records:
+        for column, values in zip(GAME_HISTORY_COLUMNS, zip(*records)):
+            gameColumns[column].extend(values)
+
+def gameColumnsToDataFrame(gameColumns):
+    if not gameColumns[GAME_HISTORY_COLUMNS[0]]:
+        return pd.DataFrame(columns=GAME_HISTORY_COLUMNS)
+
+    gameDf = pd.DataFrame(gameColumns, columns=GAME_HISTORY_COLUMNS)
+    gameDf['opponent_rating'] = gameDf['opponent_rating'].astype(str).str.replace(r'\D', '', regex=True)
+    gameDf['opponent_rating'] = pd.to_numeric(gameDf['opponent_rating'], errors='coerce')
+    gameDf['result'] = gameDf['result'].astype(float)
 
+    return gameDf
 
+def ratingPeriodLink(fide_id, period, rating_type='std', base_url=None):
+    base_url = base_url or FIDE_RATINGS_BASE_URL
+    return f"{base_url}/a_indv_calculations.php?id_number={fide_id}&rating_period={period}&t={RATING_TYPE_CODES[rating_type]}"
+
+def scrapeRatingPeriods(fide_id, playerName, periods, progress_bar=None, max_workers=MAX_CONCURRENT_PERIODS, base_url=None, rating_type='std'):
+    """Fetches and parses the given rating periods.
+
+    Returns the games DataFrame and {rating_period: (outcome, game_count)}, where outcome is
+    'ok', 'empty' or 'error'.
+    """
+    allLinks = [ratingPeriodLink(fide_id, period, rating_type, base_url) for period in periods]
+
+    # Baixar todos os periodos em paralelo; o parse e a barra de progresso ficam na thread principal
+    periodRecords = [None] * len(allLinks)
+    periodOutcomes = {}
+    failedPeriods = []
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {executor.submit(fetchRatingPeriodPage, link): index for index, link in enumerate(allLinks)}
+        for finished, future in enumerate(as_completed(futures)):
+            index = futures[future]
+            try:
+                periodRecords[index] = parseRatingPeriodPage(future.result(), playerName)
+                periodOutcomes[periods[index]] = ('ok' if periodRecords[index] else 'empty', len(periodRecords[index]))
+            except Exception:
+                failedPeriods.append(periods[index])
+                periodOutcomes[periods[index]] = ('error', 0)
+
+            # Update progress bar if it's passed as an argument
+            if progress_bar is not None:
+                progress_bar.progress((finished + 1) / len(allLinks))
+
+    if failedPeriods:
+        print(f"Falha ao baixar {len(failedPeriods)} periodo(s) de {fide_id}: {', '.join(sorted(failedPeriods))}")
+
+    # Juntar os resultados na ordem dos periodos
+    gameColumns = newGameColumns()
+    for records in periodRecords:
+        appendGameRecords(gameColumns, records)
+
+    return gameColumnsToDataFrame(gameColumns), periodOutcomes
+
+def scrapePlayerGamesHistory(fide_id, playerName, startingPeriod, endPeriod, progress_bar=None, max_workers=MAX_CONCURRENT_PERIODS, base_url=None, rating_type='std'):
+    fullDateRange = buildRatingPeriods(startingPeriod, endPeriod)
+    gameDf, _ = scrapeRatingPeriods(fide_id, playerName, fullDateRange, progress_bar, max_workers, base_url, rating_type)
     return gameDf
 
-def fetch_game_history(fide_id, playerName, startingPeriod, endPeriod, progress_bar=None):
-    with sqlite3.connect('./database/fide_data.db') as conn:
-        cursor = conn.cursor()
-
-        # Garantir que as datas de entrada estejam no início de seus respectivos meses
-        startingPeriod = datetime.strptime(startingPeriod, "%Y-%m-%d").replace(day=1)
-        endPeriod = datetime.strptime(endPeriod, "%Y-%m-%d").replace(day=1)
-
-        # Verificar as datas de jogo mais antigas e mais recentes no banco de dados para o jogador
-        cursor.execute("SELECT MIN(date), MAX(date) FROM game_history WHERE fide_id = ?", (fide_id,))
-        min_max_date = cursor.fetchone()
-
-        if min_max_date[0] is None or min_max_date[1] is None:
-            # Se nenhum dado existir, buscar pelo período solicitado inteiro
-            fetched_games_df = scrapePlayerGamesHistory(fide_id, playerName, startingPeriod.strftime('%Y-%m-%d'), endPeriod.strftime('%Y-%m-%d'), progress_bar)
-            insertGameData(cursor, fetched_games_df, fide_id)
-        else:
-            db_start_date, db_end_date = [datetime.strptime(date, "%Y-%m-%d") for date in min_max_date]
-
-            # Buscar e inserir dados para o período antes do registro mais antigo, se necessário
-            if db_start_date > startingPeriod:
-                fetched_games_df_before = scrapePlayerGamesHistory(fide_id, playerName, startingPeriod.strftime('%Y-%m-%d'), (db_start_date - relativedelta.relativedelta(days=1)).strftime('%Y-%m-%d'))
-                insertGameData(cursor, fetched_games_df_before, fide_id)
-
-            # Buscar e inserir dados para o período após o registro mais recente, se necessário
-            if db_end_date < endPeriod:
-                fetched_games_df_after = scrapePlayerGamesHistory(fide_id, playerName, (db_end_date + relativedelta.relativedelta(days=1)).strftime('%Y-%m-%d'), endPeriod.strftime('%Y-%m-%d'))
-                insertGameData(cursor, fetched_games_df_after, fide_id)
-
-        conn.commit()
-
-        # Recuperar e retornar os dados completos para o período solicitado
-        cursor.execute("SELECT * FROM game_history WHERE fide_id = ? AND date BETWEEN ? AND ?", (fide_id, startingPeriod.strftime('%Y-%m-%d'), endPeriod.strftime('%Y-%m-%d')))
-        games = cursor.fetchall()
-        if games:
-            games_df = pd.DataFrame(games, columns=['id', 'fide_id', 'date', 'tournament_name', 'country', 'player_name', 'player_rating', 'player_color', 'opponent_name', 'opponent_rating', 'result', 'chg', 'k', 'k_chg'])
-            return games_df
-        else:
-            return pd.DataFrame()  # Retornar um DataFrame vazio se nenhum jogo for encontrado
+def periodsToSync(periods, coverage, now=None):
+    # Baixar apenas periodos nunca vistos, que falharam ou que ainda estao abertos e ficaram velhos
+    now = now or datetime.now()
+    missing = []
+    for period in periods:
+        if period not in coverage:
+            missing.append(period)
+            continue
+        fetched_at, outcome = coverage[period]
+        if outcome == 'error':
+            missing.append(period)
+        elif isOpenRatingPeriod(period, now) and (now - datetime.strptime(fetched_at, "%Y-%m-%d %H:%M:%S")).total_seconds() > OPEN_PERIOD_TTL:
+            missing.append(period)
+    return missing
+
+def storeGameHistory(cursor, fide_id, rating_type, games, periodOutcomes):
+    insertGameData(cursor, games, fide_id, rating_type)
+    record_period_coverage(cursor, fide_id, rating_type, periodOutcomes)
+
+def syncGameHistory(fide_id, playerName, startingPeriod, endPeriod, progress_bar=None, base_url=None, rating_type='std'):
+    # Consultar o registro de cobertura e buscar somente os periodos faltantes ou desatualizados
+    requestedPeriods = buildRatingPeriods(startingPeriod, endPeriod)
+    missingPeriods = periodsToSync(requestedPeriods, get_period_coverage(read_connection().cursor(), fide_id, rating_type))
+
+    if missingPeriods:
+        # Nenhuma trava de escrita enquanto as paginas sao baixadas; a gravacao vai para a fila da
+        # thread escritora, que junta as sessoes concorrentes em poucas transacoes
+        fetched_games_df, periodOutcomes = scrapeRatingPeriods(fide_id, playerName, missingPeriods, progress_bar, base_url=base_url, rating_type=rating_type)
+        get_ingest_writer().write(storeGameHistory, fide_id, rating_type, fetched_games_df, periodOutcomes)
+
+def fetch_game_history(fide_id, playerName, startingPeriod, endPeriod, progress_bar=None, base_url=None, rating_type='std'):
+    reader = read_connection()
+
+    # Garantir que as datas de entrada estejam no início de seus respectivos meses
+    startingPeriod = datetime.strptime(startingPeriod, "%Y-%m-%d").replace(day=1)
+    endPeriod = datetime.strptime(endPeriod, "%Y-%m-%d").replace(day=1)
+
+    # Sessoes pedindo o mesmo jogador e intervalo esperam o crawl em andamento (e veem o mesmo progresso)
+    # em vez de baixar as mesmas paginas de novo
+    key = (str(fide_id), rating_type, startingPeriod.strftime('%Y-%m-%d'), endPeriod.strftime('%Y-%m-%d'))
+    get_single_flight().do(key, lambda progress: syncGameHistory(fide_id, playerName, key[2], key[3], progress, base_url, rating_type), progress_bar)
+
+    # Recuperar e retornar os dados completos para o período solicitado
+    # As colunas ja sao numericas no banco; so a data precisa virar datetime
+    games_df = pd.read_sql_query("SELECT * FROM game_history WHERE fide_id = ? AND rating_type = ? AND date BETWEEN ? AND ?", reader,
+                                 params=(fide_id, rating_type, startingPeriod.strftime('%Y-%m-%d'), endPeriod.strftime('%Y-%m-%d')),
+                                 parse_dates={'date': '%Y-%m-%d'})
+    if games_df.empty:
+        return pd.DataFrame()  # Retornar um DataFrame vazio se nenhum jogo for encontrado
+    return games_df
 
 def process_game_history(df):
     if not df.empty:
         duplicate_columns = ['date', 'tournament_name', 'player_name', 'opponent_name', 'result'] 
-        df['date'] = pd.to_datetime(df['date'])
         df.sort_values('date', inplace=True)
-        df['player_rating'] = pd.to_numeric(df['player_rating'], errors='coerce')
-        df['opponent_rating'] = pd.to_numeric(df['opponent_rating'], errors='coerce')
-        df['result'] = df['result'].astype(float)
         df.drop_duplicates(subset=duplicate_columns, inplace=True)
         df.sort_values('date', inplace=True)
-        df.dropna(inplace=True)
+        # Oponente sem FIDE ID (nome ambiguo ou fora de player_data) continua sendo uma partida valida
+        df.dropna(subset=[column for column in df.columns if column != 'opponent_fide_id'], inplace=True)
         df.reset_index(drop=True, inplace=True)
     return df
 
@@ -0,0 +1,195 @@
+import os
+import re
+import atexit
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+from dateutil import relativedelta
+
+# Diretorio do cache de paginas brutas (HTML comprimido, enderecado pelo conteudo)
+HTML_CACHE_DIR = os.environ.get('FIDE_HTML_CACHE_DIR', './cache/html')
+
+# Tamanho maximo do cache em bytes (comprimidos) antes de remover as entradas menos usadas
+HTML_CACHE_MAX_BYTES = int(os.environ.get('FIDE_HTML_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+# Os acessos (last_access, usado so para escolher o que remover) ficam em memoria e sao gravados
+# juntos: ao gravar uma pagina, ou quando acumulam este numero de URLs ou este intervalo em segundos
+HTML_CACHE_ACCESS_FLUSH_ENTRIES = 256
+HTML_CACHE_ACCESS_FLUSH_SECONDS = 30
+
+# Periodos ainda abertos podem mudar; guardar por no maximo este tempo (segundos)
+OPEN_PERIOD_TTL = 6 * 60 * 60
+
+# Quantos meses para tras um periodo de rating ainda e considerado aberto
+OPEN_PERIOD_MONTHS = 2
+
+def isOpenRatingPeriod(period, now=None):
+    """Tells whether a rating period (YYYY-MM-DD) may still change on the FIDE side."""
+    periodDate = datetime.strptime(period, "%Y-%m-%d")
+    now = now or datetime.now()
+    firstOpenPeriod = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0) - relativedelta.relativedelta(months=OPEN_PERIOD_MONTHS)
+    return periodDate >= firstOpenPeriod
+
+def ratingPeriodTtl(url, now=None):
+    """Returns None (keep forever) for closed rating periods, OPEN_PERIOD_TTL otherwise."""
+    match = re.search(r'rating_period=(\d{4}-\d{2}-\d{2})', url)
+    if not match:
+        return OPEN_PERIOD_TTL
+    return OPEN_PERIOD_TTL if isOpenRatingPeriod(match.group(1), now) else None
+
+class HtmlCache:
+    """Compressed on-disk response cache keyed by URL, with blobs stored by content hash."""
+
+    def __init__(self, cache_dir=HTML_CACHE_DIR, max_bytes=HTML_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # URL -> ultimo acesso ainda nao gravado no indice
+        self._accesses = {}
+        self._accesses_flushed_at = time.time()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(cache_dir, 'index.db'), check_same_thread=False)
+        # O indice pode ser reconstruido a partir dos downloads: WAL sem fsync a cada commit basta
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.execute('''
+        CREATE TABLE IF NOT EXISTS entries (
+            url TEXT PRIMARY KEY,
+            content_hash TEXT NOT NULL,
+            stored_at REAL NOT NULL,
+            expires_at REAL,
+            last_access REAL NOT NULL
+        );
+        ''')
+        self._conn.execute('''
+        CREATE TABLE IF NOT EXISTS blobs (
+            content_hash TEXT PRIMARY KEY,
+            size INTEGER NOT NULL
+        );
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access);')
+        self._conn.commit()
+
+    def _blob_path(self, content_hash):
+        return os.path.join(self.cache_dir, content_hash[:2], content_hash + '.z')
+
+    def get(self, url):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT content_hash, expires_at FROM entries WHERE url = ?", (url,)).fetchone()
+            if row is None or (row[1] is not None and row[1] < now):
+                self.misses += 1
+                return None
+        # Leitura e descompressao fora do lock: outras threads consultam o indice enquanto isso
+        try:
+            with open(self._blob_path(row[0]), 'rb') as f:
+                html = zlib.decompress(f.read()).decode('utf-8')
+        except (OSError, zlib.error):
+            with self._lock:
+                self._conn.execute("DELETE FROM entries WHERE url = ? AND content_hash = ?", (url, row[0]))
+                self._conn.commit()
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+            self._accesses[url] = now
+            if len(self._accesses) >= HTML_CACHE_ACCESS_FLUSH_ENTRIES or now - self._accesses_flushed_at >= HTML_CACHE_ACCESS_FLUSH_SECONDS:
+                self._flush_accesses()
+                self._conn.commit()
+        return html
+
+    def _flush_accesses(self):
+        # Chamado com o lock; quem chama faz o commit
+        if self._accesses:
+            self._conn.executemany("UPDATE entries SET last_access = ? WHERE url = ?", [(accessed_at, url) for url, accessed_at in self._accesses.items()])
+            self._accesses.clear()
+        self._accesses_flushed_at = time.time()
+
+    def flush(self):
+        """Writes the pending last_access updates to the index."""
+        with self._lock:
+            self._flush_accesses()
+            self._conn.commit()
+
+    def put(self, url, html, ttl=None):
+        data = html.encode('utf-8')
+        content_hash = hashlib.sha256(data).hexdigest()
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        with self._lock:
+            path = self._blob_path(content_hash)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                compressed = zlib.compress(data, 6)
+                tmp_path = path + '.tmp'
+                with open(tmp_path, 'wb') as f:
+                    f.write(compressed)
+                os.replace(tmp_path, path)
+                self._conn.execute("INSERT OR REPLACE INTO blobs (content_hash, size) VALUES (?, ?)", (content_hash, len(compressed)))
+            # Acessos pendentes entram no mesmo commit, antes de _evict ordenar por last_access
+            self._flush_accesses()
+            self._conn.execute("INSERT OR REPLACE INTO entries (url, content_hash, stored_at, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                               (url, content_hash, now, expires_at, now))
+            self._conn.commit()
+            self._evict()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Remover primeiro as entradas expiradas e depois as menos acessadas
+        self._conn.execute("DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),))
+        total -= self._drop_orphan_blobs()
+        for url, content_hash in self._conn.execute("SELECT url, content_hash FROM entries ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM entries WHERE url = ?", (url,))
+            self.evictions += 1
+            total -= self._drop_orphan_blobs(content_hash)
+        self._conn.commit()
+
+    def _drop_orphan_blobs(self, content_hash=None):
+        query = "SELECT content_hash, size FROM blobs WHERE content_hash NOT IN (SELECT content_hash FROM entries)"
+        params = ()
+        if content_hash is not None:
+            query += " AND content_hash = ?"
+            params = (content_hash,)
+        freed = 0
+        for orphan_hash, size in self._conn.execute(query, params).fetchall():
+            try:
+                os.remove(self._blob_path(orphan_hash))
+            except OSError:
+                pass
+            self._conn.execute("DELETE FROM blobs WHERE content_hash = ?", (orphan_hash,))
+            freed += size
+        return freed
+
+    def urls(self, pattern='%'):
+        """Returns the cached URLs matching a SQL LIKE pattern."""
+        with self._lock:
+            return [url for url, in self._conn.execute("SELECT url FROM entries WHERE url LIKE ? ORDER BY url", (pattern,)).fetchall()]
+
+    def stats(self):
+        with self._lock:
+            entries, = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+            size, = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'entries': entries, 'bytes': size}
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_html_cache():
+    """Returns the process-wide cache, opening it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = HtmlCache()
+                atexit.register(_cache.flush)
+    return _cache
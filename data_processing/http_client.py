@@ -0,0 +1,107 @@
+import os
+import time
+import random
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+from data_processing.rate_limiter import get_rate_limiter
+
+# Tamanho do pool de conexoes por host (deve cobrir o numero de downloads em paralelo)
+HTTP_POOL_SIZE = int(os.environ.get('FIDE_HTTP_POOL_SIZE', 16))
+
+# Timeout padrao (conexao, leitura) em segundos para todas as requisicoes a FIDE
+HTTP_TIMEOUT = (5, 30)
+
+# Novas tentativas em respostas 429/5xx e timeouts, com backoff exponencial e jitter
+HTTP_MAX_RETRIES = 4
+HTTP_BACKOFF_BASE = 0.5
+HTTP_BACKOFF_MAX = 30
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+DEFAULT_HEADERS = {
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36',
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+def _build_session(pool_size):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=True)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+def get_session():
+    """Returns the process-wide pooled session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session(HTTP_POOL_SIZE)
+    return _session
+
+def configure_http_client(pool_size=None, timeout=None):
+    """Rebuilds the shared session with a new pool size and/or default timeout."""
+    global _session, HTTP_POOL_SIZE, HTTP_TIMEOUT
+    with _session_lock:
+        if pool_size is not None:
+            HTTP_POOL_SIZE = pool_size
+        if timeout is not None:
+            HTTP_TIMEOUT = timeout
+        if _session is not None:
+            _session.close()
+        _session = _build_session(HTTP_POOL_SIZE)
+
+def _retry_after_seconds(response):
+    # Limitado a HTTP_BACKOFF_MAX: um Retry-After de horas nao pode parar o processo inteiro
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+    return min(HTTP_BACKOFF_MAX, max(0.0, seconds))
+
+def _backoff_seconds(attempt):
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2 ** attempt)))
+
+def http_get(url, **kwargs):
+    """GET through the shared session and rate limiter, retrying throttling, 5xx and timeouts.
+
+    Raises requests.RequestException once the retries are exhausted, so callers never
+    mistake an error page for an empty result.
+    """
+    kwargs.setdefault('timeout', HTTP_TIMEOUT)
+    limiter = get_rate_limiter()
+    attempt = 0
+    while True:
+        try:
+            with limiter.slot():
+                response = get_session().get(url, **kwargs)
+        except (requests.Timeout, requests.ConnectionError):
+            if attempt >= HTTP_MAX_RETRIES:
+                raise
+            delay = _backoff_seconds(attempt)
+        else:
+            if response.status_code not in RETRY_STATUS_CODES:
+                return response
+            if attempt >= HTTP_MAX_RETRIES:
+                response.raise_for_status()
+            retry_after = _retry_after_seconds(response)
+            delay = retry_after if retry_after is not None else _backoff_seconds(attempt)
+            if response.status_code == 429:
+                # Todo o processo desacelera, nao so esta requisicao
+                limiter.pause(delay)
+        limiter.record_retry()
+        attempt += 1
+        time.sleep(delay)
@@ -0,0 +1,108 @@
+"""Backfill of opponent FIDE IDs for games stored before the calc_table parser read the profile links.
+
+First re-parses the cached a_indv_calculations pages, which link every opponent to their profile;
+opponents still known only by name are then fuzzy-matched against player_data, and accepted only
+when a single player (of the recorded federation, when there is more than one) matches.
+
+Usage:
+    python -m data_processing.opponent_backfill
+    python -m data_processing.opponent_backfill --skip-fuzzy
+"""
+import time
+import argparse
+from urllib.parse import urlparse, parse_qs
+from database.database_management import initialize_database
+from database.game_store import assign_opponent_id, merge_players, drop_unused_players
+from database.connection import DB_PATH, write_transaction
+from data_processing.html_cache import get_html_cache
+from data_processing.calc_table_parser import parseCalcTable
+from data_processing.player_index import PlayerNameIndex
+from data_processing.data_fetching_processing import gameRows, RATING_TYPE_CODES
+
+# Pontuacao minima do rapidfuzz para aceitar um nome sem o link do perfil
+BACKFILL_MIN_SCORE = 95
+
+# Parametro t da URL de calculo -> tipo de rating dos torneios
+RATING_TYPES_BY_CODE = {str(code): rating_type for rating_type, code in RATING_TYPE_CODES.items()}
+
+def backfill_from_cache(db_path=DB_PATH, cache=None):
+    """Re-parses every cached rating period page; returns how many stored games got the opponent's ID."""
+    cache = cache or get_html_cache()
+    updated = 0
+    for url in cache.urls('%a_indv_calculations.php?%'):
+        params = parse_qs(urlparse(url).query)
+        fide_id = params.get('id_number', [None])[0]
+        rating_type = RATING_TYPES_BY_CODE.get(params.get('t', ['0'])[0])
+        html = cache.get(url)
+        if not fide_id or rating_type is None or html is None:
+            continue
+        with write_transaction(db_path) as cursor:
+            cursor.execute("SELECT name FROM players WHERE fide_id = ?", (fide_id,))
+            player = cursor.fetchone()
+            if player is None:
+                continue
+            rows = gameRows(parseCalcTable(html, player[0]))
+            for date, tournament_name, _, _, _, player_color, opponent_name, _, result, _, _, _, opponent_fide_id in rows:
+                if opponent_fide_id and assign_opponent_id(cursor, fide_id, tournament_name, date, player_color, opponent_name, result, opponent_fide_id, rating_type):
+                    updated += 1
+    return updated
+
+def _recorded_federations(cursor, player_id):
+    # Federacao do oponente anotada nas paginas de calculo dos jogadores que o enfrentaram
+    cursor.execute('''
+    SELECT white_federation FROM games WHERE white_id = ? AND white_federation IS NOT NULL
+    UNION
+    SELECT black_federation FROM games WHERE black_id = ? AND black_federation IS NOT NULL
+    ''', (player_id, player_id))
+    return {row[0] for row in cursor.fetchall()}
+
+def _match_player(cursor, index, player_id, name):
+    candidates = {fide_id for _, fide_id, _, _, _ in index.search(name, min_score=BACKFILL_MIN_SCORE)}
+    if len(candidates) > 1:
+        federations = _recorded_federations(cursor, player_id)
+        if not federations:
+            return None
+        placeholders = ','.join('?' * len(candidates))
+        # As paginas de calculo anotam o codigo da federacao, como a lista de rating
+        cursor.execute(f"SELECT fide_id FROM player_data WHERE fide_id IN ({placeholders}) AND federation_code IN ({','.join('?' * len(federations))})",
+                       (*candidates, *federations))
+        candidates = {row[0] for row in cursor.fetchall()}
+    return candidates.pop() if len(candidates) == 1 else None
+
+def backfill_from_player_data(db_path=DB_PATH):
+    """Fuzzy-matches the opponents still known only by name; returns how many were resolved."""
+    index = PlayerNameIndex(db_path)
+    resolved = 0
+    with write_transaction(db_path) as cursor:
+        cursor.execute("SELECT id, name FROM players WHERE fide_id IS NULL")
+        for player_id, name in cursor.fetchall():
+            fide_id = _match_player(cursor, index, player_id, name)
+            if fide_id is None:
+                continue
+            cursor.execute("SELECT id FROM players WHERE fide_id = ?", (fide_id,))
+            existing = cursor.fetchone()
+            if existing is None:
+                cursor.execute("UPDATE players SET fide_id = ? WHERE id = ?", (fide_id, player_id))
+            else:
+                merge_players(cursor, player_id, existing[0])
+            resolved += 1
+    return resolved
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill opponent FIDE IDs of stored games')
+    parser.add_argument('--skip-fuzzy', action='store_true', help='only use the profile links of cached calc pages')
+    args = parser.parse_args()
+
+    initialize_database()
+    started = time.monotonic()
+    print(f"{backfill_from_cache()} partidas atualizadas a partir do cache de paginas")
+    if not args.skip_fuzzy:
+        print(f"{backfill_from_player_data()} oponentes resolvidos por nome em player_data")
+    with write_transaction() as cursor:
+        # Registros so com o nome que ficaram sem partidas
+        drop_unused_players(cursor)
+        cursor.execute("SELECT COUNT(*) FROM players WHERE fide_id IS NULL")
+        print(f"{cursor.fetchone()[0]} oponentes ainda sem FIDE ID ({time.monotonic() - started:.1f}s)")
+
+if __name__ == '__main__':
+    main()
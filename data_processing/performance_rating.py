@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+from database.connection import read_connection
+
+# Tabela dp da FIDE (Rating Regulations 8.1.a) para p = 0.50, 0.51, ..., 1.00;
+# para p < 0.50 o valor e o mesmo com sinal negativo
+DP_TABLE = np.array([
+    0, 7, 14, 21, 29, 36, 43, 50, 57, 65,
+    72, 80, 87, 95, 102, 110, 117, 125, 133, 141,
+    149, 158, 166, 175, 184, 193, 202, 211, 220, 230,
+    240, 251, 262, 273, 284, 296, 309, 322, 336, 351,
+    366, 383, 401, 422, 444, 470, 501, 538, 589, 677,
+    800,
+])
+
+# Limites entre as linhas da tabela, em centesimos de distancia a p = 0.50
+_DP_EDGES = np.arange(len(DP_TABLE) - 1) + 0.5
+
+def ratingDifference(points, games):
+    """FIDE dp for scoring points in games; accepts scalars or arrays of any game count."""
+    points = np.asarray(points, dtype=float)
+    games = np.asarray(games, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # |p - 0.5| em centesimos; calculado assim e exato para meios pontos
+        distance = np.abs(2 * points - games) * 50 / games
+    # p arredondado para o centesimo mais proximo; empates ficam do lado de 0.50, como na tabela
+    dp = DP_TABLE[np.searchsorted(_DP_EDGES, np.nan_to_num(distance), side='left')] * np.sign(2 * points - games)
+    return np.where(games > 0, dp, np.nan)
+
+def ratingPerformance(games, points, opponentsAverageRating):
+    """Performance rating Ra + dp, rounded; vectorized over tournaments."""
+    return np.rint(np.asarray(opponentsAverageRating, dtype=float) + ratingDifference(points, games))
+
+def tournamentPerformance(games_df, keys=None):
+    """Returns one row per tournament with games, points, opponent_average and performance.
+
+    Games against unrated opponents or without a result do not count, as in the FIDE calculation.
+    """
+    keys = keys or [column for column in ('fide_id', 'rating_type', 'tournament_name', 'date') if column in games_df]
+    rated = games_df[games_df['result'].notna() & games_df['opponent_rating'].notna()]
+    summary = rated.groupby(keys, sort=False).agg(
+        games=('result', 'size'),
+        points=('result', 'sum'),
+        opponent_average=('opponent_rating', 'mean'),
+    ).reset_index()
+    summary['performance'] = ratingPerformance(summary['games'].to_numpy(), summary['points'].to_numpy(), summary['opponent_average'].to_numpy())
+    return summary
+
+def loadTournamentPerformance(db_path=None):
+    """Per-tournament performance of every stored player, aggregated in SQLite and computed in one vectorized pass."""
+    summary = pd.read_sql_query('''
+    SELECT fide_id, rating_type, tournament_name, date, COUNT(*) AS games, SUM(result) AS points, AVG(opponent_rating) AS opponent_average
+    FROM game_history
+    WHERE result IS NOT NULL AND opponent_rating IS NOT NULL
+    GROUP BY fide_id, rating_type, tournament_name, date
+    ''', read_connection(db_path))
+    summary['performance'] = ratingPerformance(summary['games'].to_numpy(), summary['points'].to_numpy(), summary['opponent_average'].to_numpy())
+    return summary
@@ -0,0 +1,138 @@
+import re
+import sqlite3
+import threading
+import unicodedata
+from array import array
+from collections import defaultdict
+import numpy as np
+from rapidfuzz import fuzz, process
+from database.connection import DB_PATH, read_connection
+
+# Pontuacao minima (0-100) para considerar que a busca local encontrou o jogador
+MIN_MATCH_SCORE = 85
+
+# Quantos candidatos por trigramas sao pontuados com rapidfuzz
+MAX_CANDIDATES = 500
+
+# Letras que o NFKD nao decompoe em letra base + acento
+_SPECIAL_LETTERS = str.maketrans({'đ': 'd', 'ð': 'd', 'ø': 'o', 'ł': 'l', 'ß': 'ss', 'æ': 'ae', 'œ': 'oe', 'þ': 'th', 'ı': 'i'})
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+def normalizeName(name):
+    """Lowercases, strips accents and punctuation: 'Niemann, Hans Moke' -> 'niemann hans moke'."""
+    name = (name or '').lower()
+    if not name.isascii():
+        name = unicodedata.normalize('NFKD', name.translate(_SPECIAL_LETTERS))
+        name = ''.join(char for char in name if not unicodedata.combining(char))
+    return ' '.join(_NON_ALNUM.sub(' ', name).split())
+
+def nameTrigrams(normalized):
+    # Quase todos os trigramas ficam dentro de uma palavra, entao "Sobrenome, Nome" e
+    # "Nome Sobrenome" compartilham a maioria deles; a ordem e resolvida pelo rapidfuzz
+    padded = f'  {normalized} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class PlayerNameIndex:
+    """In-memory trigram index over player_data names, loaded lazily and refreshed incrementally.
+
+    Each player has one entry. refresh() reads only the rows whose index_seq grew since the last read
+    (new players and changed names, titles or ratings).
+    """
+
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._players = []
+        self._names = []
+        self._postings = defaultdict(lambda: array('I'))
+        # fide_id -> posicao em _players; entradas substituidas ficam como None ate a compactacao
+        self._docs = {}
+        self._dead = 0
+        self._last_seq = 0
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, fide_id, name, title=None, rating=None):
+        """Adds a player, or replaces the entry of a player already in the index."""
+        fide_id = str(fide_id)
+        normalized = normalizeName(name)
+        doc = self._docs.get(fide_id)
+        if doc is not None:
+            # Mesmo nome: os trigramas continuam valendo, so titulo e rating mudam
+            if normalized == self._names[doc]:
+                self._players[doc] = (fide_id, name, title, rating)
+                return
+            self._players[doc] = self._names[doc] = None
+            del self._docs[fide_id]
+            self._dead += 1
+        if normalized:
+            self._append((fide_id, name, title, rating), normalized)
+
+    def _append(self, player, normalized):
+        doc = len(self._players)
+        self._players.append(player)
+        self._names.append(normalized)
+        self._docs[player[0]] = doc
+        postings = self._postings
+        for trigram in nameTrigrams(normalized):
+            postings[trigram].append(doc)
+
+    def _compact(self):
+        live = [(player, normalized) for player, normalized in zip(self._players, self._names) if player is not None]
+        self._players, self._names, self._docs, self._dead = [], [], {}, 0
+        self._postings = defaultdict(lambda: array('I'))
+        for player, normalized in live:
+            self._append(player, normalized)
+
+    def refresh(self):
+        """Loads the player_data rows inserted or changed since the last refresh."""
+        with self._lock:
+            try:
+                rows = read_connection(self.db_path).execute(
+                    "SELECT index_seq, fide_id, name, fide_title, std_rating FROM player_data WHERE index_seq > ? ORDER BY index_seq",
+                    (self._last_seq,)
+                ).fetchall()
+            except sqlite3.Error:
+                return
+            for seq, fide_id, name, title, rating in rows:
+                self.add(fide_id, name, title, rating)
+                self._last_seq = seq
+            # Nomes trocados deixam entradas mortas nas postings: reconstruir quando forem maioria
+            if self._dead > len(self._docs):
+                self._compact()
+
+    def _candidates(self, normalized):
+        postings = [np.frombuffer(self._postings[trigram], dtype=np.uint32) for trigram in nameTrigrams(normalized) if trigram in self._postings]
+        if not postings:
+            return []
+        counts = np.bincount(np.concatenate(postings), minlength=len(self._players))
+        size = min(MAX_CANDIDATES, int(np.count_nonzero(counts)))
+        top = np.argpartition(counts, -size)[-size:]
+        return [int(doc) for doc in top if counts[doc] > 0 and self._players[doc] is not None]
+
+    def search(self, query, limit=20, min_score=MIN_MATCH_SCORE):
+        """Returns [(score, fide_id, name, title, rating)] best first."""
+        self.refresh()
+        normalized = normalizeName(query)
+        if not normalized:
+            return []
+        with self._lock:
+            docs = self._candidates(normalized)
+            choices = {doc: self._names[doc] for doc in docs}
+            matches = process.extract(normalized, choices, scorer=fuzz.WRatio, limit=None, score_cutoff=min_score)
+            results = [(score, *self._players[doc]) for _, score, doc in matches]
+        results.sort(key=lambda result: (-result[0], -int(result[4]) if str(result[4] or '').isdigit() else 0, result[2]))
+        return results[:limit]
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_player_index():
+    """Returns the process-wide index; rows are only read from the DB on the first search."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = PlayerNameIndex()
+    return _index
@@ -0,0 +1,97 @@
+from io import BytesIO
+from lxml import etree
+
+# Rotulos do bloco de informacoes do perfil e a chave correspondente em player_data
+PROFILE_LABELS = {
+    'World Rank (Active):': 'world_rank',
+    'Federation:': 'federation',
+    'B-Year:': 'b_year',
+    'Sex:': 'sex',
+    'FIDE title:': 'fide_title',
+}
+
+# Tudo o que interessa fica depois da primeira classe profile-top; o <head> e os menus sao ignorados
+_REGION_MARKER = b'profile-top'
+
+def _profile_region(data):
+    start = data.find(_REGION_MARKER)
+    if start < 0:
+        return data
+    start = data.rfind(b'<', 0, start)
+    return data[start:] if start >= 0 else data
+
+def _classes(element):
+    return (element.get('class') or '').split()
+
+def _text(element):
+    return ''.join(element.itertext())
+
+def _single_string(element):
+    # Equivalente ao .string do BeautifulSoup: o unico texto do elemento, descendo por filhos unicos
+    while True:
+        children = [child for child in element if isinstance(child.tag, str)]
+        if not children:
+            return element.text
+        if len(children) > 1 or element.text or children[0].tail:
+            return None
+        element = children[0]
+
+def _previous_div(element):
+    sibling = element.getprevious()
+    while sibling is not None and sibling.tag != 'div':
+        sibling = sibling.getprevious()
+    return sibling
+
+def parseProfilePage(html, fide_id):
+    """Extracts the player_data fields of a /profile/{id} page in one pass over the profile-top region."""
+    # O <meta charset> fica fora da regiao lida: texto ou bytes, a pagina e sempre UTF-8
+    data = html.encode('utf-8') if isinstance(html, str) else html
+    player_data = {'fide_id': fide_id, 'name': ''}
+    player_data.update({key: '' for key in PROFILE_LABELS.values()})
+    player_data['profile_photo'] = None
+    # Pagina vazia (requisicao que falhou): o perfil fica sem dados, como numa pagina sem perfil
+    if not data.strip():
+        return player_data
+
+    name_found = photo_found = False
+    ratings_found = False
+    # Elemento do rotulo -> chave; o valor e a proxima div irma
+    labels = {}
+    missing_labels = set(PROFILE_LABELS)
+
+    for _, element in etree.iterparse(BytesIO(_profile_region(data)), events=('end',), html=True, recover=True, encoding='utf-8'):
+        if not isinstance(element.tag, str):
+            continue
+        classes = _classes(element)
+
+        if 'profile-top-rating-data' in classes:
+            ratings_found = True
+            span = next(element.iter('span'), None)
+            rating_type = _text(span).strip().lower() if span is not None else ''
+            player_data[f'{rating_type}_rating'] = ''.join(filter(str.isdigit, _text(element)))
+
+        if element.tag != 'div':
+            continue
+
+        if not name_found and 'profile-top-title' in classes:
+            name_found = True
+            player_data['name'] = _text(element).strip()
+        elif not photo_found and 'profile-top__photo' in classes:
+            photo_found = True
+            img = next(element.iter('img'), None)
+            if img is not None:
+                player_data['profile_photo'] = img.get('src', '')
+
+        label = _single_string(element)
+        if label in missing_labels:
+            missing_labels.discard(label)
+            labels[element] = PROFILE_LABELS[label]
+
+        previous = _previous_div(element)
+        if previous is not None and previous in labels:
+            player_data[labels.pop(previous)] = _text(element)
+            # O bloco de informacoes vem depois de foto, nome e ratings: nada mais a ler
+            if not missing_labels and not labels and name_found and photo_found and ratings_found:
+                break
+
+    return player_data
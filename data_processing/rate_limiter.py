@@ -0,0 +1,101 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+# Limites globais para as requisicoes aos servidores da FIDE
+MAX_REQUESTS_PER_SECOND = float(os.environ.get('FIDE_MAX_REQUESTS_PER_SECOND', 5))
+MAX_BURST = int(os.environ.get('FIDE_MAX_BURST', 5))
+MAX_IN_FLIGHT = int(os.environ.get('FIDE_MAX_IN_FLIGHT', 8))
+
+class RateLimiter:
+    """Token bucket (requests/sec with a burst allowance) plus a cap on in-flight requests."""
+
+    def __init__(self, rate=MAX_REQUESTS_PER_SECOND, burst=MAX_BURST, max_in_flight=MAX_IN_FLIGHT):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self._in_flight = threading.BoundedSemaphore(max(1, max_in_flight))
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+
+    def _take_token(self):
+        # Retorna quanto tempo esperar antes de tentar de novo (0 se o token foi obtido)
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self.rate <= 0:
+                return 0.0
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    @contextmanager
+    def slot(self):
+        """Waits for a token and an in-flight slot; yields the seconds spent waiting."""
+        started = time.monotonic()
+        self._in_flight.acquire()
+        try:
+            delay = self._take_token()
+            while delay > 0:
+                time.sleep(delay)
+                delay = self._take_token()
+            waited = time.monotonic() - started
+            with self._lock:
+                self.requests += 1
+                self.wait_seconds += waited
+            yield waited
+        finally:
+            self._in_flight.release()
+
+    def pause(self, seconds):
+        """Stops handing out tokens for a while, e.g. after a 429 with Retry-After."""
+        with self._lock:
+            self.throttled += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'retries': self.retries,
+                'throttled': self.throttled,
+                'wait_seconds': self.wait_seconds,
+                'avg_wait_seconds': self.wait_seconds / self.requests if self.requests else 0.0,
+            }
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+def get_rate_limiter():
+    """Returns the process-wide limiter shared by every FIDE fetcher."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter()
+    return _limiter
+
+def configure_rate_limiter(rate=None, burst=None, max_in_flight=None):
+    """Replaces the shared limiter with new limits."""
+    global _limiter
+    with _limiter_lock:
+        _limiter = RateLimiter(
+            rate=MAX_REQUESTS_PER_SECOND if rate is None else rate,
+            burst=MAX_BURST if burst is None else burst,
+            max_in_flight=MAX_IN_FLIGHT if max_in_flight is None else max_in_flight,
+        )
+    return _limiter
@@ -0,0 +1,104 @@
+import threading
+
+class Flight:
+    """One in-flight call. Works as a progress bar for the caller running it and relays each update to the waiters."""
+
+    def __init__(self, progress_bar=None):
+        self._progress_bar = progress_bar
+        self._condition = threading.Condition()
+        self._fraction = None
+        self._finished = False
+        self._result = None
+        self._error = None
+
+    def progress(self, fraction):
+        with self._condition:
+            self._fraction = fraction
+            self._condition.notify_all()
+        if self._progress_bar is not None:
+            self._progress_bar.progress(fraction)
+
+    def finish(self, result=None, error=None):
+        with self._condition:
+            self._result, self._error, self._finished = result, error, True
+            self._condition.notify_all()
+
+    def wait(self, progress_bar=None):
+        """Blocks until the call finishes; returns (finished normally, result) and re-raises its exception."""
+        shown = None
+        with self._condition:
+            while True:
+                # Cada sessao do Streamlit so pode atualizar a sua barra na propria thread
+                if progress_bar is not None and self._fraction is not None and self._fraction != shown:
+                    shown = self._fraction
+                    self._condition.release()
+                    try:
+                        progress_bar.progress(shown)
+                    finally:
+                        self._condition.acquire()
+                    continue
+                if self._finished:
+                    break
+                self._condition.wait()
+        if self._error is None:
+            return True, self._result
+        # Interrupcao de controle de quem executava (ex.: rerun da sessao no Streamlit): quem espera tenta de novo
+        if not isinstance(self._error, Exception):
+            return False, None
+        raise self._error
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key: the first caller runs the function, the others wait and share its result."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key, fn, progress_bar=None):
+        """Returns fn(progress), where progress is a progress bar stand-in that every waiter on key also sees."""
+        while True:
+            with self._lock:
+                self.calls += 1
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = Flight(progress_bar)
+                else:
+                    self.shared += 1
+            if leader:
+                break
+            finished, result = flight.wait(progress_bar)
+            if finished:
+                return result
+
+        try:
+            result = fn(flight)
+        except BaseException as e:
+            self._land(key, flight, error=e)
+            raise
+        self._land(key, flight, result=result)
+        return result
+
+    def _land(self, key, flight, result=None, error=None):
+        # Sai do registro antes de acordar quem espera: chamadas novas comecam outro voo
+        with self._lock:
+            del self._flights[key]
+        flight.finish(result, error)
+
+    def stats(self):
+        with self._lock:
+            return {'calls': self.calls, 'shared': self.shared, 'in_flight': len(self._flights)}
+
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+def get_single_flight():
+    """Returns the process-wide SingleFlight shared by all sessions and crawlers."""
+    global _single_flight
+    if _single_flight is None:
+        with _single_flight_lock:
+            if _single_flight is None:
+                _single_flight = SingleFlight()
+    return _single_flight
@@ -0,0 +1,101 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+
+# Caminho do banco; FIDE_DB_PATH permite apontar o app e os crawlers para outro arquivo
+DB_PATH = os.environ.get('FIDE_DB_PATH', './database/fide_data.db')
+
+# Ajustes de desempenho aplicados a cada conexao (o modo WAL fica gravado no arquivo do banco)
+SQLITE_CACHE_SIZE_KB = int(os.environ.get('FIDE_SQLITE_CACHE_KB', 64 * 1024))
+SQLITE_MMAP_SIZE = int(os.environ.get('FIDE_SQLITE_MMAP_BYTES', 256 * 1024 * 1024))
+SQLITE_BUSY_TIMEOUT = 30
+
+def configure_connection(conn, readonly=False):
+    """WAL journal, synchronous=NORMAL (durable at checkpoints, safe against corruption), larger page cache and mmap."""
+    if not readonly:
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA cache_size = -{SQLITE_CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+class Database:
+    """Per-thread SQLite connections to one database file: a read-only reader and a writer used through transaction()."""
+
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def _connect(self, readonly):
+        if readonly:
+            uri = Path(self.db_path).resolve().as_uri() + '?mode=ro'
+            conn = sqlite3.connect(uri, uri=True, timeout=SQLITE_BUSY_TIMEOUT)
+        else:
+            conn = sqlite3.connect(self.db_path, timeout=SQLITE_BUSY_TIMEOUT)
+        return configure_connection(conn, readonly)
+
+    def reader(self):
+        """Read-only connection of the calling thread; sees everything committed by any writer."""
+        conn = getattr(self._local, 'reader', None)
+        if conn is None:
+            # Banco ainda nao criado: o modo somente leitura nao consegue abrir o arquivo
+            if not os.path.exists(self.db_path):
+                return self.writer()
+            conn = self._local.reader = self._connect(readonly=True)
+        return conn
+
+    def writer(self):
+        conn = getattr(self._local, 'writer', None)
+        if conn is None:
+            conn = self._local.writer = self._connect(readonly=False)
+            self._local.depth = 0
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Yields a cursor of the thread's writer; commits on exit, rolls back on error. Nested blocks join the outer one."""
+        conn = self.writer()
+        self._local.depth += 1
+        try:
+            yield conn.cursor()
+            if self._local.depth == 1:
+                conn.commit()
+        except BaseException:
+            if self._local.depth == 1:
+                conn.rollback()
+            raise
+        finally:
+            self._local.depth -= 1
+
+    def checkpoint(self):
+        # Copia as paginas do WAL para o arquivo principal (ex.: antes de oferecer o arquivo para download)
+        self.writer().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        """Closes the calling thread's connections."""
+        for name in ('reader', 'writer'):
+            conn = getattr(self._local, name, None)
+            if conn is not None:
+                conn.close()
+                setattr(self._local, name, None)
+
+_databases = {}
+_databases_lock = threading.Lock()
+
+def get_database(db_path=None):
+    """Returns the process-wide Database for db_path (DB_PATH by default)."""
+    db_path = db_path or DB_PATH
+    database = _databases.get(db_path)
+    if database is None:
+        with _databases_lock:
+            database = _databases.setdefault(db_path, Database(db_path))
+    return database
+
+def read_connection(db_path=None):
+    return get_database(db_path).reader()
+
+def write_transaction(db_path=None):
+    return get_database(db_path).transaction()
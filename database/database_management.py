@@ -1,73 +1,314 @@
-import sqlite3
+import re
+import threading
+from datetime import datetime
+from database.connection import get_database
+from database.photo_store import create_photo_table, store_profile_photo
+from database.game_store import migrate_game_dates, migrate_game_history_table, migrate_game_seq, migrate_opponent_id_view, migrate_tournament_rating_type
 
-def initialize_database():
-    conn = sqlite3.connect('./database/fide_data.db')
-    cursor = conn.cursor()
+# Versao do esquema gravada em PRAGMA user_version; cada migracao leva o banco para a versao seguinte
+SCHEMA_VERSION = 10
 
+# Chave natural de uma partida: a mesma linha da pagina de calculo baixada de novo nao gera outra partida
+GAME_KEY_COLUMNS = ['date', 'tournament_name', 'player_name', 'opponent_name', 'result']
+
+PLAYER_DATA_TABLE = '''
+CREATE TABLE IF NOT EXISTS {table} (
+    fide_id TEXT PRIMARY KEY,
+    name TEXT,
+    federation TEXT,
+    federation_code TEXT,
+    b_year INTEGER,
+    sex TEXT,
+    fide_title TEXT,
+    std_rating INTEGER,
+    rapid_rating INTEGER,
+    blitz_rating INTEGER,
+    profile_photo TEXT,
+    world_rank INTEGER,
+    fetched_at TEXT,
+    photo_hash TEXT,
+    index_seq INTEGER
+);
+'''
+
+# index_seq cresce a cada jogador novo ou com nome, titulo ou rating std alterado: o indice de nomes
+# (player_index) le so o que mudou desde a ultima leitura, qualquer que seja o caminho de gravacao
+PLAYER_INDEX_SEQ_TRIGGERS = [
+'''
+CREATE TRIGGER IF NOT EXISTS player_data_index_seq_insert AFTER INSERT ON player_data
+BEGIN
+    UPDATE player_data SET index_seq = (SELECT COALESCE(MAX(index_seq), 0) + 1 FROM player_data) WHERE rowid = NEW.rowid;
+END;
+''',
+'''
+CREATE TRIGGER IF NOT EXISTS player_data_index_seq_update AFTER UPDATE OF name, fide_title, std_rating ON player_data
+WHEN OLD.name IS NOT NEW.name OR OLD.fide_title IS NOT NEW.fide_title OR OLD.std_rating IS NOT NEW.std_rating
+BEGIN
+    UPDATE player_data SET index_seq = (SELECT COALESCE(MAX(index_seq), 0) + 1 FROM player_data) WHERE rowid = NEW.rowid;
+END;
+''',
+]
+
+GAME_HISTORY_TABLE = '''
+CREATE TABLE IF NOT EXISTS {table} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fide_id TEXT,
+    date TEXT,
+    tournament_name TEXT,
+    country TEXT,
+    player_name TEXT,
+    player_rating INTEGER,
+    player_color TEXT,
+    opponent_name TEXT,
+    opponent_rating INTEGER,
+    result REAL,
+    chg REAL,
+    k INTEGER,
+    k_chg REAL,
+    FOREIGN KEY(fide_id) REFERENCES player_data(fide_id)
+);
+'''
+
+_DIGITS = re.compile(r'-?\d+')
+_NUMBER = re.compile(r'-?\d+(?:\.\d+)?')
+_DATE = re.compile(r'(\d{4})[-./](\d{1,2})[-./](\d{1,2})')
+
+def to_int(value):
+    """'2706', ' 2706 *', 2706.0 -> 2706; None for empty or non-numeric values."""
+    if value is None or isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return None if value != value else int(value)
+    match = _DIGITS.search(str(value).replace(' ', ''))
+    return int(match.group()) if match else None
+
+def to_real(value):
+    """'-2.30' -> -2.3; None for empty or non-numeric values."""
+    if value is None or isinstance(value, float):
+        return None if value != value else value
+    if isinstance(value, int):
+        return float(value)
+    match = _NUMBER.search(str(value).replace(' ', '').replace(',', '.'))
+    return float(match.group()) if match else None
+
+def to_fide_id(value):
+    """FIDE IDs are stored as TEXT: 2093596, '2093596', 2093596.0 -> '2093596'; None when missing."""
+    value = to_int(value)
+    return str(value) if value else None
+
+def to_iso_date(value):
+    """'2023.4.11', '2023/04/11', '2023-04-11 00:00:00' -> '2023-04-11'; None when there is no date."""
+    match = _DATE.search(str(value)) if value is not None else None
+    if match is None:
+        return None
+    year, month, day = match.groups()
+    return f"{year}-{int(month):02d}-{int(day):02d}"
+
+# Bancos ja verificados neste processo: os reruns do Streamlit nao repetem a checagem do esquema
+_initialized = set()
+_initialized_lock = threading.Lock()
+
+def initialize_database(db_path=None):
+    database = get_database(db_path)
+    if database.db_path in _initialized:
+        return
+    with _initialized_lock:
+        if database.db_path in _initialized:
+            return
+        with database.transaction() as cursor:
+            create_tables(cursor)
+        _initialized.add(database.db_path)
+
+def create_tables(cursor):
     # Criar a tabela player_data se ela não existir
+    cursor.execute(PLAYER_DATA_TABLE.format(table='player_data'))
+    create_photo_table(cursor)
+
+    # Bancos criados antes do cache de perfis não têm as colunas fetched_at e photo_hash
+    cursor.execute("PRAGMA table_info(player_data)")
+    player_data_columns = [column[1] for column in cursor.fetchall()]
+    if 'fetched_at' not in player_data_columns:
+        cursor.execute("ALTER TABLE player_data ADD COLUMN fetched_at TEXT")
+    if 'photo_hash' not in player_data_columns:
+        cursor.execute("ALTER TABLE player_data ADD COLUMN photo_hash TEXT")
+        migrate_profile_photos(cursor)
+
+    # Criar a tabela game_history se ela não existir
+    cursor.execute(GAME_HISTORY_TABLE.format(table='game_history'))
+
+    # Criar a tabela period_coverage (quais paginas de calculo ja foram baixadas) se ela não existir
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'period_coverage'")
+    coverage_exists = cursor.fetchone() is not None
     cursor.execute('''
-    CREATE TABLE IF NOT EXISTS player_data (
-        fide_id TEXT PRIMARY KEY,
-        name TEXT,
-        federation TEXT,
-        b_year TEXT,
-        sex TEXT,
-        fide_title TEXT,
-        std_rating TEXT,
-        rapid_rating TEXT,
-        blitz_rating TEXT,
-        profile_photo TEXT,
-        world_rank TEXT
+    CREATE TABLE IF NOT EXISTS period_coverage (
+        fide_id TEXT NOT NULL,
+        rating_period TEXT NOT NULL,
+        rating_type TEXT NOT NULL,
+        fetched_at TEXT NOT NULL,
+        outcome TEXT NOT NULL,
+        game_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (fide_id, rating_period, rating_type)
     );
     ''')
+    if not coverage_exists:
+        seed_period_coverage(cursor)
 
-    # Criar a tabela game_history se ela não existir
+    migrate_schema(cursor)
+
+def migrate_typed_columns(cursor):
+    # Versao 1: colunas numericas deixam de ser TEXT e as datas ficam em ISO (AAAA-MM-DD)
+    connection = cursor.connection
+    connection.create_function('to_int', 1, to_int, deterministic=True)
+    connection.create_function('to_real', 1, to_real, deterministic=True)
+    connection.create_function('to_iso_date', 1, to_iso_date, deterministic=True)
+
+    cursor.execute("DROP TABLE IF EXISTS game_history_typed")
+    cursor.execute(GAME_HISTORY_TABLE.format(table='game_history_typed'))
     cursor.execute('''
-    CREATE TABLE IF NOT EXISTS game_history (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        fide_id TEXT,
-        date TEXT,
-        tournament_name TEXT,
-        country TEXT,
-        player_name TEXT,
-        player_rating TEXT,
-        player_color TEXT,
-        opponent_name TEXT,
-        opponent_rating TEXT,
-        result TEXT,
-        chg TEXT,
-        k TEXT,
-        k_chg TEXT,
-        FOREIGN KEY(fide_id) REFERENCES player_data(fide_id)
-    );
+    INSERT INTO game_history_typed (id, fide_id, date, tournament_name, country, player_name, player_rating, player_color, opponent_name, opponent_rating, result, chg, k, k_chg)
+    SELECT id, fide_id, to_iso_date(date), tournament_name, country, player_name, to_int(player_rating), player_color, opponent_name, to_int(opponent_rating), to_real(result), to_real(chg), to_int(k), to_real(k_chg)
+    FROM game_history
     ''')
+    cursor.execute("DROP TABLE game_history")
+    cursor.execute("ALTER TABLE game_history_typed RENAME TO game_history")
+
+    cursor.execute("DROP TABLE IF EXISTS player_data_typed")
+    cursor.execute(PLAYER_DATA_TABLE.format(table='player_data_typed'))
+    cursor.execute('''
+    INSERT INTO player_data_typed (fide_id, name, federation, b_year, sex, fide_title, std_rating, rapid_rating, blitz_rating, profile_photo, world_rank, fetched_at, photo_hash)
+    SELECT fide_id, name, federation, to_int(b_year), sex, fide_title, to_int(std_rating), to_int(rapid_rating), to_int(blitz_rating), profile_photo, to_int(world_rank), fetched_at, photo_hash
+    FROM player_data
+    ''')
+    cursor.execute("DROP TABLE player_data")
+    cursor.execute("ALTER TABLE player_data_typed RENAME TO player_data")
+
+def migrate_unique_game_key(cursor):
+    # Versao 2: limpeza unica das partidas repetidas (fica a primeira gravada, como no antigo
+    # remove_duplicates_in_db) e indice unico para que novas repeticoes nao entrem no banco
+    cursor.execute(f'''
+    DELETE FROM game_history
+    WHERE id NOT IN (SELECT MIN(id) FROM game_history GROUP BY {', '.join(GAME_KEY_COLUMNS)})
+    ''')
+    cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_game_history_key ON game_history({', '.join(GAME_KEY_COLUMNS)})")
+
+def migrate_game_indexes(cursor):
+    # Versao 3: leituras por jogador deixam de varrer a tabela inteira. Estes indices saem na versao 4
+    # junto com a tabela game_history; os de games sao os da versao 10 (create_game_indexes)
+    # - historico de um jogador num intervalo de datas (fetch_game_history)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_game_history_player_date ON game_history(fide_id, date)")
+    # - oponentes de um jogador com o maior rating (opponent_graph), respondido so pelo indice
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_game_history_player_opponent ON game_history(fide_id, opponent_name, opponent_rating)")
+    # - partidas contra um oponente e partidas de um torneio
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_game_history_opponent ON game_history(opponent_name)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_game_history_tournament ON game_history(tournament_name, date)")
+    cursor.execute("ANALYZE game_history")
+
+# Versao 4: torneios, jogadores e uma linha por partida (game_store); game_history vira uma view
+# Versao 5: a view passa a expor opponent_fide_id
+# Versao 6: torneios separados por tipo de rating (std, rapid, blitz); a view expoe rating_type
+
+def migrate_federation_code(cursor):
+    # Versao 7: o codigo da federacao (BRA) da lista de rating fica em federation_code; federation
+    # guarda so o nome exibido no perfil (Brazil)
+    cursor.execute("PRAGMA table_info(player_data)")
+    if 'federation_code' not in [column[1] for column in cursor.fetchall()]:
+        cursor.execute("ALTER TABLE player_data ADD COLUMN federation_code TEXT")
+    # Jogadores importados antes desta versao tinham o codigo gravado em federation
+    cursor.execute("UPDATE player_data SET federation_code = federation, federation = NULL WHERE federation GLOB '[A-Z][A-Z][A-Z]'")
+
+def migrate_player_index_seq(cursor):
+    # Versao 8: index_seq, mantido por triggers, marca as linhas novas ou alteradas para o indice de nomes
+    cursor.execute("PRAGMA table_info(player_data)")
+    if 'index_seq' not in [column[1] for column in cursor.fetchall()]:
+        cursor.execute("ALTER TABLE player_data ADD COLUMN index_seq INTEGER")
+    cursor.execute("UPDATE player_data SET index_seq = rowid")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_player_data_index_seq ON player_data(index_seq)")
+    for trigger in PLAYER_INDEX_SEQ_TRIGGERS:
+        cursor.execute(trigger)
+
+# Versao 9: game_seq entra na chave de games; partidas iguais no mesmo torneio deixam de virar uma so
+# Versao 10: games guarda a data do torneio, indexada por jogador (historico num intervalo de datas)
+
+# Migracao i leva o banco da versao i para a versao i + 1
+SCHEMA_MIGRATIONS = [migrate_typed_columns, migrate_unique_game_key, migrate_game_indexes, migrate_game_history_table, migrate_opponent_id_view, migrate_tournament_rating_type, migrate_federation_code, migrate_player_index_seq,
+                     migrate_game_seq, migrate_game_dates]
+
+def migrate_schema(cursor):
+    """Applies the pending SCHEMA_MIGRATIONS in order, in the caller's transaction."""
+    cursor.execute("PRAGMA user_version")
+    version, = cursor.fetchone()
+    for migration in SCHEMA_MIGRATIONS[version:]:
+        migration(cursor)
+    if version < SCHEMA_VERSION:
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+def migrate_profile_photos(cursor):
+    # Mover as fotos base64 antigas para o armazenamento de miniaturas
+    cursor.execute("SELECT fide_id, profile_photo FROM player_data WHERE profile_photo LIKE 'data:%'")
+    for fide_id, profile_photo in cursor.fetchall():
+        photo_hash = store_profile_photo(cursor, profile_photo)
+        if photo_hash is not None:
+            cursor.execute("UPDATE player_data SET photo_hash = ?, profile_photo = NULL WHERE fide_id = ?", (photo_hash, fide_id))
+
+def seed_period_coverage(cursor):
+    # Jogadores já salvos antes do registro de cobertura: considerar cobertos os meses entre
+    # a primeira e a última partida, que era exatamente o que a sincronização antiga assumia
+    cursor.execute('''
+    WITH RECURSIVE months(fide_id, rating_period, last_period) AS (
+        SELECT fide_id, date(MIN(date), 'start of month'), date(MAX(date), 'start of month')
+        FROM game_history
+        WHERE date IS NOT NULL
+        GROUP BY fide_id
+        UNION ALL
+        SELECT fide_id, date(rating_period, '+1 month'), last_period
+        FROM months
+        WHERE rating_period < last_period
+    )
+    INSERT OR IGNORE INTO period_coverage (fide_id, rating_period, rating_type, fetched_at, outcome, game_count)
+    SELECT fide_id, rating_period, 'std', datetime('now'), 'legacy', 0 FROM months;
+    ''')
+
+def get_period_coverage(cursor, fide_id, rating_type='std'):
+    """Returns {rating_period: (fetched_at, outcome)} for the pages already fetched for a player."""
+    cursor.execute("SELECT rating_period, fetched_at, outcome FROM period_coverage WHERE fide_id = ? AND rating_type = ?", (fide_id, rating_type))
+    return {period: (fetched_at, outcome) for period, fetched_at, outcome in cursor.fetchall()}
+
+def record_period_coverage(cursor, fide_id, rating_type, period_outcomes):
+    """Stores the outcome of each fetched page; period_outcomes maps rating_period -> (outcome, game_count)."""
+    fetched_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    cursor.executemany(
+        "INSERT OR REPLACE INTO period_coverage (fide_id, rating_period, rating_type, fetched_at, outcome, game_count) VALUES (?, ?, ?, ?, ?, ?)",
+        [(fide_id, period, rating_type, fetched_at, outcome, game_count) for period, (outcome, game_count) in period_outcomes.items()]
+    )
+
+PLAYER_DATA_COLUMNS = ['fide_id', 'name', 'federation', 'b_year', 'sex', 'fide_title', 'std_rating', 'rapid_rating', 'blitz_rating', 'profile_photo', 'world_rank']
+PLAYER_DATA_INTEGER_COLUMNS = ['b_year', 'std_rating', 'rapid_rating', 'blitz_rating', 'world_rank']
+
+def upsert_player_data(cursor, player_data):
+    """Stores a scraped profile (the dict returned by scrapePlayerData) in player_data, stamped with fetched_at."""
+    # Pagina de perfil vazia ou com erro: nao sobrescrever dados bons
+    if not player_data.get('name'):
+        return
+    # A foto vai para profile_photos como miniatura; o data URI só fica se não for uma imagem
+    photo_hash = store_profile_photo(cursor, player_data.get('profile_photo'))
+    row = dict(player_data, fetched_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S"), photo_hash=photo_hash)
+    if photo_hash is not None:
+        row['profile_photo'] = None
+    for column in PLAYER_DATA_INTEGER_COLUMNS:
+        row[column] = to_int(row.get(column))
+    columns = PLAYER_DATA_COLUMNS + ['fetched_at', 'photo_hash']
+    # Atualizar a linha existente: federation_code vem da lista de rating e o rowid nao muda
+    cursor.execute(
+        f'''INSERT INTO player_data ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})
+        ON CONFLICT(fide_id) DO UPDATE SET {', '.join(f'{column} = excluded.{column}' for column in columns[1:])}''',
+        tuple(row.get(column) for column in columns)
+    )
 
-    conn.commit()
-    conn.close()
-
-def remove_duplicates_in_db():
-    with sqlite3.connect('./database/fide_data.db') as conn:
-        cursor = conn.cursor()
-
-        # Ativar temporariamente suporte a chaves estrangeiras, se necessário
-        cursor.execute('PRAGMA foreign_keys = ON;')
-
-        # Etapa 1: Identificar e excluir duplicatas
-        delete_sql = """
-        DELETE FROM game_history
-        WHERE id IN (
-            SELECT id
-            FROM (
-                SELECT id,
-                       ROW_NUMBER() OVER (
-                           PARTITION BY date, tournament_name, player_name, opponent_name, result
-                           ORDER BY id -- Ajuste isso para manter o registro que deseja (por exemplo, o mais antigo ou o mais recente)
-                       ) AS rn
-                FROM game_history
-            ) 
-            WHERE rn > 1 -- Isso mantém a primeira ocorrência e marca as subsequentes para exclusão
-        );
-        """
-        cursor.execute(delete_sql)
-        conn.commit()
-        
+def get_player_data(cursor, fide_id):
+    """Returns the stored profile as a dict (None values left out), or None if the player is unknown."""
+    columns = PLAYER_DATA_COLUMNS + ['federation_code', 'fetched_at', 'photo_hash']
+    cursor.execute(f"SELECT {', '.join(columns)} FROM player_data WHERE fide_id = ?", (fide_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return {column: value for column, value in zip(columns, row) if value is not None}
@@ -0,0 +1,346 @@
+from itertools import groupby
+
+# Modelo normalizado: cada partida e uma unica linha em games, mesmo quando os dois jogadores
+# foram raspados. Cada perspectiva (pagina de calculo das brancas ou das pretas) preenche
+# as suas colunas chg/k/k_chg e marca white_seen/black_seen.
+
+TOURNAMENTS_TABLE = '''
+CREATE TABLE IF NOT EXISTS {table} (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    date TEXT,
+    rating_type TEXT NOT NULL DEFAULT 'std',
+    UNIQUE (name, date, rating_type)
+);
+'''
+
+# game_seq numera as partidas iguais (mesmos jogadores, cores e resultado) de um torneio: match ou
+# turno e returno entre os mesmos jogadores. date repete tournaments.date para que o historico de
+# um jogador num intervalo de datas seja uma busca por faixa em idx_games_white/black_date
+GAMES_TABLE = '''
+CREATE TABLE IF NOT EXISTS {table} (
+    id INTEGER PRIMARY KEY,
+    tournament_id INTEGER NOT NULL REFERENCES tournaments(id),
+    white_id INTEGER NOT NULL REFERENCES players(id),
+    black_id INTEGER NOT NULL REFERENCES players(id),
+    white_result REAL,
+    game_seq INTEGER NOT NULL DEFAULT 1,
+    date TEXT,
+    white_rating INTEGER,
+    black_rating INTEGER,
+    white_federation TEXT,
+    black_federation TEXT,
+    white_chg REAL,
+    white_k INTEGER,
+    white_k_chg REAL,
+    black_chg REAL,
+    black_k INTEGER,
+    black_k_chg REAL,
+    white_seen INTEGER NOT NULL DEFAULT 0,
+    black_seen INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (tournament_id, white_id, black_id, white_result, game_seq)
+);
+'''
+
+def create_game_indexes(cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_games_white_date ON games(white_id, date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_games_black_date ON games(black_id, date)")
+
+def create_game_tables(cursor):
+    cursor.execute(TOURNAMENTS_TABLE.format(table='tournaments'))
+    # fide_id fica NULL para oponentes conhecidos so pelo nome (nome ambiguo ou fora de player_data)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS players (
+        id INTEGER PRIMARY KEY,
+        fide_id TEXT UNIQUE,
+        name TEXT NOT NULL
+    );
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_players_name ON players(name)")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_players_unresolved_name ON players(name) WHERE fide_id IS NULL")
+    cursor.execute(GAMES_TABLE.format(table='games'))
+    create_game_indexes(cursor)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tournaments_date ON tournaments(date)")
+    # Resolucao de nomes de oponentes em IDs
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_player_data_name ON player_data(name)")
+
+# Formato antigo de game_history (uma linha por jogador raspado), montado a partir de games
+GAME_HISTORY_VIEW = '''
+CREATE VIEW IF NOT EXISTS game_history AS
+SELECT g.id * 2 AS id, w.fide_id AS fide_id, g.date AS date, t.name AS tournament_name, g.black_federation AS country,
+       w.name AS player_name, g.white_rating AS player_rating, 'white' AS player_color, b.name AS opponent_name,
+       g.black_rating AS opponent_rating, g.white_result AS result, g.white_chg AS chg, g.white_k AS k, g.white_k_chg AS k_chg,
+       b.fide_id AS opponent_fide_id, t.rating_type AS rating_type
+FROM games g
+JOIN tournaments t ON t.id = g.tournament_id
+JOIN players w ON w.id = g.white_id
+JOIN players b ON b.id = g.black_id
+WHERE g.white_seen = 1
+UNION ALL
+SELECT g.id * 2 + 1, b.fide_id, g.date, t.name, g.white_federation,
+       b.name, g.black_rating, 'black', w.name,
+       g.white_rating, 1 - g.white_result, g.black_chg, g.black_k, g.black_k_chg,
+       w.fide_id, t.rating_type
+FROM games g
+JOIN tournaments t ON t.id = g.tournament_id
+JOIN players w ON w.id = g.white_id
+JOIN players b ON b.id = g.black_id
+WHERE g.black_seen = 1;
+'''
+
+STORE_WHITE_SQL = '''
+INSERT INTO games (tournament_id, white_id, black_id, white_result, game_seq, date, white_rating, black_rating, black_federation, white_chg, white_k, white_k_chg, white_seen)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+ON CONFLICT(tournament_id, white_id, black_id, white_result, game_seq) DO UPDATE SET
+    white_rating = excluded.white_rating,
+    black_rating = excluded.black_rating,
+    black_federation = excluded.black_federation,
+    white_chg = excluded.white_chg,
+    white_k = excluded.white_k,
+    white_k_chg = excluded.white_k_chg,
+    white_seen = 1
+'''
+
+STORE_BLACK_SQL = '''
+INSERT INTO games (tournament_id, white_id, black_id, white_result, game_seq, date, black_rating, white_rating, white_federation, black_chg, black_k, black_k_chg, black_seen)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+ON CONFLICT(tournament_id, white_id, black_id, white_result, game_seq) DO UPDATE SET
+    black_rating = excluded.black_rating,
+    white_rating = excluded.white_rating,
+    white_federation = excluded.white_federation,
+    black_chg = excluded.black_chg,
+    black_k = excluded.black_k,
+    black_k_chg = excluded.black_k_chg,
+    black_seen = 1
+'''
+
+def ensure_tournament(cursor, name, date, rating_type='std'):
+    cursor.execute("INSERT INTO tournaments (name, date, rating_type) VALUES (?, ?, ?) ON CONFLICT(name, date, rating_type) DO NOTHING", (name, date, rating_type))
+    cursor.execute("SELECT id FROM tournaments WHERE name = ? AND date IS ? AND rating_type = ?", (name, date, rating_type))
+    return cursor.fetchone()[0]
+
+def ensure_player(cursor, fide_id, name):
+    """Returns players.id for a FIDE ID, adopting the name-only row of the same player when there is one."""
+    fide_id = str(fide_id)
+    cursor.execute("SELECT id, name FROM players WHERE fide_id = ?", (fide_id,))
+    row = cursor.fetchone()
+    if row is not None:
+        if name and row[1] != name:
+            cursor.execute("UPDATE players SET name = ? WHERE id = ?", (name, row[0]))
+        return row[0]
+    # Oponente gravado antes so pelo nome: se o nome nao for de outro jogador, e este jogador
+    cursor.execute("SELECT id FROM players WHERE name = ? AND fide_id IS NULL", (name,))
+    row = cursor.fetchone()
+    if row is not None and not _other_fide_ids(cursor, name, fide_id):
+        cursor.execute("UPDATE players SET fide_id = ? WHERE id = ?", (fide_id, row[0]))
+        return row[0]
+    cursor.execute("INSERT INTO players (fide_id, name) VALUES (?, ?)", (fide_id, name))
+    return cursor.lastrowid
+
+def _other_fide_ids(cursor, name, fide_id=None):
+    cursor.execute('''
+    SELECT fide_id FROM players WHERE name = ? AND fide_id IS NOT NULL
+    UNION
+    SELECT fide_id FROM player_data WHERE name = ?
+    ''', (name, name))
+    return {row[0] for row in cursor.fetchall()} - {fide_id}
+
+def resolve_opponent(cursor, name):
+    """Returns players.id for an opponent known only by name; the FIDE ID is used when the name is unambiguous."""
+    candidates = _other_fide_ids(cursor, name)
+    if len(candidates) == 1:
+        return ensure_player(cursor, candidates.pop(), name)
+    cursor.execute("INSERT INTO players (name) VALUES (?) ON CONFLICT(name) WHERE fide_id IS NULL DO NOTHING", (name,))
+    cursor.execute("SELECT id FROM players WHERE name = ? AND fide_id IS NULL", (name,))
+    return cursor.fetchone()[0]
+
+def store_games(cursor, fide_id, rows, rating_type='std'):
+    """Stores typed game rows of one player, (date, tournament_name, country, player_name, player_rating,
+    player_color, opponent_name, opponent_rating, result, chg, k, k_chg, opponent_fide_id), as one games row per pairing.
+
+    The games are filed under tournaments of the given rating_type ('std', 'rapid' or 'blitz'). rows must hold
+    all the games of each of its tournaments, as a calculation page does: identical pairings are numbered in order.
+    """
+    tournaments = {}
+    opponents = {}
+    players = {}
+    pairings = {}
+    white_rows = []
+    black_rows = []
+    for date, tournament_name, country, player_name, player_rating, player_color, opponent_name, opponent_rating, result, chg, k, k_chg, opponent_fide_id in rows:
+        if (date, tournament_name) not in tournaments:
+            tournaments[date, tournament_name] = ensure_tournament(cursor, tournament_name, date, rating_type)
+        if player_name not in players:
+            players[player_name] = ensure_player(cursor, fide_id, player_name)
+        # Com o ID do link do perfil nao ha ambiguidade; sem ele o nome e resolvido por player_data
+        if (opponent_name, opponent_fide_id) not in opponents:
+            if opponent_fide_id:
+                opponents[opponent_name, opponent_fide_id] = ensure_player(cursor, opponent_fide_id, opponent_name)
+            else:
+                opponents[opponent_name, opponent_fide_id] = resolve_opponent(cursor, opponent_name)
+        tournament_id, player_id, opponent_id = tournaments[date, tournament_name], players[player_name], opponents[opponent_name, opponent_fide_id]
+        if player_color == 'white':
+            key = (tournament_id, player_id, opponent_id, result)
+        else:
+            key = (tournament_id, opponent_id, player_id, None if result is None else 1 - result)
+        # A pagina do oponente lista as mesmas partidas na mesma ordem: a n-esima repeticao e a mesma partida
+        pairings[key] = game_seq = pairings.get(key, 0) + 1
+        if player_color == 'white':
+            white_rows.append(key + (game_seq, date, player_rating, opponent_rating, country, chg, k, k_chg))
+        else:
+            black_rows.append(key + (game_seq, date, player_rating, opponent_rating, country, chg, k, k_chg))
+    if white_rows:
+        cursor.executemany(STORE_WHITE_SQL, white_rows)
+    if black_rows:
+        cursor.executemany(STORE_BLACK_SQL, black_rows)
+
+def merge_games(cursor, source_id, target_id):
+    # Mesma partida gravada duas vezes: as perspectivas lidas em source passam para target
+    cursor.execute('''
+    UPDATE games SET
+        white_rating = COALESCE(src.white_rating, games.white_rating),
+        black_rating = COALESCE(src.black_rating, games.black_rating),
+        white_federation = COALESCE(src.white_federation, games.white_federation),
+        black_federation = COALESCE(src.black_federation, games.black_federation),
+        white_chg = CASE WHEN src.white_seen THEN src.white_chg ELSE games.white_chg END,
+        white_k = CASE WHEN src.white_seen THEN src.white_k ELSE games.white_k END,
+        white_k_chg = CASE WHEN src.white_seen THEN src.white_k_chg ELSE games.white_k_chg END,
+        black_chg = CASE WHEN src.black_seen THEN src.black_chg ELSE games.black_chg END,
+        black_k = CASE WHEN src.black_seen THEN src.black_k ELSE games.black_k END,
+        black_k_chg = CASE WHEN src.black_seen THEN src.black_k_chg ELSE games.black_k_chg END,
+        white_seen = MAX(games.white_seen, src.white_seen),
+        black_seen = MAX(games.black_seen, src.black_seen)
+    FROM games AS src
+    WHERE games.id = ? AND src.id = ?
+    ''', (target_id, source_id))
+    cursor.execute("DELETE FROM games WHERE id = ?", (source_id,))
+
+def set_game_player(cursor, game_id, side, player_id):
+    """Replaces the white or black player of a game, merging it into the same pairing if that already exists."""
+    cursor.execute("SELECT tournament_id, white_id, black_id, white_result, game_seq FROM games WHERE id = ?", (game_id,))
+    tournament_id, white_id, black_id, white_result, game_seq = cursor.fetchone()
+    if side == 'white':
+        white_id = player_id
+    else:
+        black_id = player_id
+    cursor.execute("SELECT id FROM games WHERE tournament_id = ? AND white_id = ? AND black_id = ? AND white_result IS ? AND game_seq = ? AND id != ?",
+                   (tournament_id, white_id, black_id, white_result, game_seq, game_id))
+    existing = cursor.fetchone()
+    if existing is None:
+        cursor.execute(f"UPDATE games SET {side}_id = ? WHERE id = ?", (player_id, game_id))
+    else:
+        merge_games(cursor, game_id, existing[0])
+
+def merge_players(cursor, source_id, target_id):
+    """Moves every game of players row source_id to target_id and deletes source_id."""
+    for side in ('white', 'black'):
+        cursor.execute(f"SELECT id FROM games WHERE {side}_id = ?", (source_id,))
+        for game_id, in cursor.fetchall():
+            set_game_player(cursor, game_id, side, target_id)
+    cursor.execute("DELETE FROM players WHERE id = ?", (source_id,))
+
+def assign_opponent_id(cursor, fide_id, tournament_name, date, player_color, opponent_name, result, opponent_fide_id, rating_type='std'):
+    """Points one stored game of fide_id, whose opponent is known only by name, to the opponent's FIDE ID.
+
+    Returns True when a game was updated.
+    """
+    cursor.execute("SELECT id FROM players WHERE fide_id = ?", (fide_id,))
+    player = cursor.fetchone()
+    cursor.execute("SELECT id FROM tournaments WHERE name = ? AND date IS ? AND rating_type = ?", (tournament_name, date, rating_type))
+    tournament = cursor.fetchone()
+    cursor.execute("SELECT id FROM players WHERE name = ? AND fide_id IS NULL", (opponent_name,))
+    unresolved = cursor.fetchone()
+    if player is None or tournament is None or unresolved is None:
+        return False
+    if player_color == 'white':
+        side, key = 'black', (tournament[0], player[0], unresolved[0], result)
+    else:
+        side, key = 'white', (tournament[0], unresolved[0], player[0], None if result is None else 1 - result)
+    # Partidas iguais no mesmo torneio: a de menor game_seq primeiro, como na pagina
+    cursor.execute("SELECT id FROM games WHERE tournament_id = ? AND white_id = ? AND black_id = ? AND white_result IS ? ORDER BY game_seq LIMIT 1", key)
+    game = cursor.fetchone()
+    if game is None:
+        return False
+    opponent_id = ensure_player(cursor, opponent_fide_id, opponent_name)
+    # O registro so com o nome pode ter sido adotado inteiro por ensure_player
+    if opponent_id != unresolved[0]:
+        set_game_player(cursor, game[0], side, opponent_id)
+    return True
+
+def drop_unused_players(cursor):
+    cursor.execute('''
+    DELETE FROM players
+    WHERE fide_id IS NULL
+      AND NOT EXISTS (SELECT 1 FROM games WHERE white_id = players.id)
+      AND NOT EXISTS (SELECT 1 FROM games WHERE black_id = players.id)
+    ''')
+
+def migrate_opponent_id_view(cursor):
+    """Recreates the game_history view with the opponent_fide_id column."""
+    cursor.execute("DROP VIEW IF EXISTS game_history")
+    cursor.execute(GAME_HISTORY_VIEW)
+
+def migrate_tournament_rating_type(cursor):
+    """Adds rating_type to tournaments (part of the unique key) and to the game_history view."""
+    cursor.execute("DROP VIEW IF EXISTS game_history")
+    cursor.execute("PRAGMA table_info(tournaments)")
+    if 'rating_type' not in [column[1] for column in cursor.fetchall()]:
+        # SQLite nao altera restricoes UNIQUE: a tabela e recriada com os mesmos ids. A nova tabela
+        # e que recebe o nome final, para nao reescrever a chave estrangeira de games
+        cursor.execute("DROP TABLE IF EXISTS tournaments_typed")
+        cursor.execute(TOURNAMENTS_TABLE.format(table='tournaments_typed'))
+        cursor.execute("INSERT INTO tournaments_typed (id, name, date, rating_type) SELECT id, name, date, 'std' FROM tournaments")
+        cursor.execute("DROP TABLE tournaments")
+        cursor.execute("ALTER TABLE tournaments_typed RENAME TO tournaments")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tournaments_date ON tournaments(date)")
+    # Paginas rapid/blitz ja baixadas foram gravadas como std: baixa-las de novo (do cache de HTML)
+    # para que entrem com o tipo certo
+    cursor.execute("DELETE FROM period_coverage WHERE rating_type != 'std'")
+    cursor.execute(GAME_HISTORY_VIEW)
+
+def migrate_game_seq(cursor):
+    """Adds game_seq to the unique key of games, so that identical pairings of one tournament are kept apart."""
+    cursor.execute("DROP VIEW IF EXISTS game_history")
+    cursor.execute("PRAGMA table_info(games)")
+    columns = [column[1] for column in cursor.fetchall()]
+    if 'game_seq' not in columns:
+        cursor.execute("DROP TABLE IF EXISTS games_typed")
+        cursor.execute(GAMES_TABLE.format(table='games_typed'))
+        cursor.execute(f"INSERT INTO games_typed ({', '.join(columns)}) SELECT {', '.join(columns)} FROM games")
+        cursor.execute("DROP TABLE games")
+        cursor.execute("ALTER TABLE games_typed RENAME TO games")
+        create_game_indexes(cursor)
+    cursor.execute(GAME_HISTORY_VIEW)
+
+def migrate_game_dates(cursor):
+    """Copies the tournament date into games and indexes it per player, for the date-range reads of game_history."""
+    cursor.execute("DROP VIEW IF EXISTS game_history")
+    cursor.execute("PRAGMA table_info(games)")
+    if 'date' not in [column[1] for column in cursor.fetchall()]:
+        cursor.execute("ALTER TABLE games ADD COLUMN date TEXT")
+    cursor.execute("UPDATE games SET date = (SELECT date FROM tournaments WHERE id = games.tournament_id)")
+    # (jogador, data) tambem atende as outras leituras por jogador, que usavam (jogador, torneio)
+    cursor.execute("DROP INDEX IF EXISTS idx_games_white")
+    cursor.execute("DROP INDEX IF EXISTS idx_games_black")
+    create_game_indexes(cursor)
+    cursor.execute("ANALYZE games")
+    cursor.execute(GAME_HISTORY_VIEW)
+
+def migrate_game_history_table(cursor):
+    """Moves the rows of the old per-player game_history table into games and replaces it with the view."""
+    create_game_tables(cursor)
+    legacy = cursor.connection.cursor()
+    # Jogadores raspados primeiro, para que os oponentes ja sejam resolvidos para eles
+    legacy.execute("SELECT fide_id, player_name FROM game_history WHERE fide_id IS NOT NULL GROUP BY fide_id, player_name ORDER BY MAX(id)")
+    for fide_id, player_name in legacy.fetchall():
+        ensure_player(cursor, fide_id, player_name)
+    legacy.execute('''
+    SELECT fide_id, date, tournament_name, country, player_name, player_rating, player_color, opponent_name, opponent_rating, result, chg, k, k_chg
+    FROM game_history
+    WHERE fide_id IS NOT NULL AND tournament_name IS NOT NULL AND player_name IS NOT NULL AND opponent_name IS NOT NULL
+    ORDER BY fide_id, id
+    ''')
+    for fide_id, rows in groupby(legacy, key=lambda row: row[0]):
+        store_games(cursor, fide_id, [row[1:] + (None,) for row in rows])
+    cursor.execute("DROP TABLE game_history")
+    cursor.execute(GAME_HISTORY_VIEW)
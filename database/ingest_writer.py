@@ -0,0 +1,123 @@
+import os
+import queue
+import atexit
+import threading
+from concurrent.futures import Future
+from database.connection import DB_PATH, get_database
+
+# Trabalhos aguardando gravacao; com a fila cheia quem envia espera (contrapressao)
+WRITE_QUEUE_SIZE = int(os.environ.get('FIDE_WRITE_QUEUE_SIZE', 256))
+# Maximo de trabalhos reunidos em uma unica transacao
+WRITE_BATCH_JOBS = int(os.environ.get('FIDE_WRITE_BATCH_JOBS', 64))
+
+class IngestWriter:
+    """Process-wide writer thread: every DB write of the app and the crawlers goes through its bounded queue.
+
+    A job is a function called as job(cursor, *args) on the writer thread. The jobs waiting in the queue
+    are run together in one transaction, each inside its own savepoint, so a failing job is rolled back
+    alone; the returned Future completes only after the transaction was committed.
+    """
+
+    def __init__(self, db_path=DB_PATH, max_pending=WRITE_QUEUE_SIZE, max_batch=WRITE_BATCH_JOBS):
+        self.db_path = db_path
+        self.max_batch = max(1, max_batch)
+        self.transactions = 0
+        self.jobs = 0
+        self._queue = queue.Queue(maxsize=max(1, max_pending))
+        self._thread = threading.Thread(target=self._run, name='fide-ingest-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, job, *args):
+        """Queues job(cursor, *args) and returns a Future with its return value."""
+        future = Future()
+        # Trabalho enviado de dentro de outro trabalho: ja esta na transacao aberta
+        if threading.current_thread() is self._thread:
+            with get_database(self.db_path).transaction() as cursor:
+                future.set_result(job(cursor, *args))
+            return future
+        if not self._thread.is_alive():
+            raise RuntimeError('ingest writer is closed')
+        self._queue.put((job, args, future))
+        return future
+
+    def write(self, job, *args, timeout=None):
+        """Runs job(cursor, *args) on the writer thread and waits until it is committed."""
+        return self.submit(job, *args).result(timeout)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            # Tudo o que chegou enquanto a transacao anterior gravava entra na mesma transacao
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        database = get_database(self.db_path)
+        outcomes = []
+        try:
+            with database.transaction() as cursor:
+                cursor.execute("BEGIN IMMEDIATE")
+                for job, args, future in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    cursor.execute("SAVEPOINT ingest_job")
+                    try:
+                        outcomes.append((future, job(cursor, *args), None))
+                    except Exception as e:
+                        cursor.execute("ROLLBACK TO ingest_job")
+                        outcomes.append((future, None, e))
+                    cursor.execute("RELEASE ingest_job")
+        except Exception as e:
+            # Falha no BEGIN/COMMIT: nenhum trabalho do lote foi gravado
+            for _, _, future in batch:
+                if future.running() or (not future.done() and future.set_running_or_notify_cancel()):
+                    future.set_exception(e)
+            return
+        self.transactions += 1
+        self.jobs += len(outcomes)
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def close(self, timeout=None):
+        """Writes everything already queued and stops the thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+    def stats(self):
+        return {'transactions': self.transactions, 'jobs': self.jobs, 'pending': self._queue.qsize()}
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+def get_ingest_writer(db_path=None):
+    """Returns the process-wide IngestWriter for db_path (DB_PATH by default), starting it on first use."""
+    db_path = db_path or DB_PATH
+    writer = _writers.get(db_path)
+    if writer is None:
+        with _writers_lock:
+            writer = _writers.get(db_path)
+            if writer is None:
+                writer = _writers[db_path] = IngestWriter(db_path)
+    return writer
+
+@atexit.register
+def _close_writers():
+    # Gravar o que ainda esta na fila antes de o processo terminar
+    for writer in list(_writers.values()):
+        writer.close()
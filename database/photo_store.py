@@ -0,0 +1,60 @@
+import base64
+import hashlib
+from io import BytesIO
+from PIL import Image
+
+# A interface exibe as fotos com 350px de largura; guardar ja nesse tamanho
+PHOTO_THUMBNAIL_WIDTH = 350
+PHOTO_JPEG_QUALITY = 85
+
+def create_photo_table(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS profile_photos (
+        content_hash TEXT PRIMARY KEY,
+        mime TEXT NOT NULL,
+        width INTEGER,
+        height INTEGER,
+        thumbnail BLOB NOT NULL
+    );
+    ''')
+
+def decode_data_uri(data_uri):
+    """Returns the raw bytes of a 'data:image/...;base64,...' URI, or None for anything else."""
+    if not data_uri or not data_uri.startswith('data:') or ',' not in data_uri:
+        return None
+    try:
+        return base64.b64decode(data_uri.split(',', 1)[1])
+    except ValueError:
+        return None
+
+def make_thumbnail(image_bytes):
+    image = Image.open(BytesIO(image_bytes))
+    if image.width > PHOTO_THUMBNAIL_WIDTH:
+        image = image.resize((PHOTO_THUMBNAIL_WIDTH, round(image.height * PHOTO_THUMBNAIL_WIDTH / image.width)), Image.LANCZOS)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    output = BytesIO()
+    image.save(output, format='JPEG', quality=PHOTO_JPEG_QUALITY, optimize=True)
+    return output.getvalue(), image.width, image.height
+
+def store_profile_photo(cursor, data_uri):
+    """Stores the photo once per distinct image and returns its content hash (None if it is not an image)."""
+    image_bytes = decode_data_uri(data_uri)
+    if image_bytes is None:
+        return None
+    content_hash = hashlib.sha256(image_bytes).hexdigest()
+    cursor.execute("SELECT 1 FROM profile_photos WHERE content_hash = ?", (content_hash,))
+    if cursor.fetchone() is None:
+        try:
+            thumbnail, width, height = make_thumbnail(image_bytes)
+        except (OSError, ValueError):
+            return None
+        cursor.execute("INSERT INTO profile_photos (content_hash, mime, width, height, thumbnail) VALUES (?, 'image/jpeg', ?, ?, ?)",
+                       (content_hash, width, height, thumbnail))
+    return content_hash
+
+def get_profile_photo(cursor, content_hash):
+    """Returns the ready-to-serve thumbnail bytes, or None."""
+    cursor.execute("SELECT thumbnail FROM profile_photos WHERE content_hash = ?", (content_hash,))
+    row = cursor.fetchone()
+    return row[0] if row else None
@@ -0,0 +1,164 @@
+"""Streaming import of the official FIDE combined rating list into player_data.
+
+Accepts the downloadable archives (players_list_xml.zip / players_list.zip) or the extracted
+.xml / .txt files, and never holds more than two batches of players in memory: one being read while
+the previous one is written.
+
+Usage:
+    python -m database.rating_list_import ~/Downloads/players_list_xml.zip
+    python -m database.rating_list_import players_list_foa.txt --batch-size 20000
+"""
+import io
+import os
+import re
+import time
+import zipfile
+import argparse
+from lxml import etree
+from database.database_management import initialize_database, to_int
+from database.connection import DB_PATH
+from database.ingest_writer import get_ingest_writer
+
+IMPORT_BATCH_SIZE = 10000
+
+# Mesmos textos exibidos na pagina de perfil da FIDE
+TITLE_NAMES = {
+    'GM': 'Grandmaster',
+    'IM': 'International Master',
+    'FM': 'FIDE Master',
+    'CM': 'Candidate Master',
+    'WGM': 'Woman Grandmaster',
+    'WIM': 'Woman International Master',
+    'WFM': 'Woman FIDE Master',
+    'WCM': 'Woman Candidate Master',
+}
+SEX_NAMES = {'M': 'Male', 'F': 'Female'}
+
+# Colunas do arquivo TXT de largura fixa, na ordem do cabecalho
+TXT_COLUMNS = ['ID Number', 'Name', 'Fed', 'Sex', 'Tit', 'WTit', 'OTit', 'FOA', 'SRtng', 'SGm', 'SK', 'RRtng', 'RGm', 'Rk', 'BRtng', 'BGm', 'BK', 'B-day', 'Flag']
+
+def _clean(value):
+    value = (value or '').strip()
+    return value if value else None
+
+def _player_row(fide_id, name, federation, sex, title, women_title, std_rating, rapid_rating, blitz_rating, b_year):
+    fide_id = _clean(fide_id)
+    if not fide_id:
+        return None
+    # Como no perfil da FIDE: o titulo absoluto (GM de uma WGM) e, sem ele, o feminino
+    title = _clean(title) or _clean(women_title)
+    sex = _clean(sex)
+    b_year = to_int(b_year)
+    return (
+        fide_id,
+        _clean(name),
+        _clean(federation),
+        b_year if b_year else None,
+        SEX_NAMES.get(sex, sex),
+        TITLE_NAMES.get(title, title),
+        to_int(std_rating),
+        to_int(rapid_rating),
+        to_int(blitz_rating),
+    )
+
+def iter_xml_players(stream):
+    for _, player in etree.iterparse(stream, events=('end',), tag='player', huge_tree=True):
+        fields = {child.tag: child.text for child in player}
+        row = _player_row(fields.get('fideid'), fields.get('name'), fields.get('country'), fields.get('sex'), fields.get('title'),
+                          fields.get('w_title'), fields.get('rating'), fields.get('rapid_rating'), fields.get('blitz_rating'), fields.get('birthday'))
+        # Liberar os elementos ja lidos para manter a memoria constante
+        player.clear()
+        while player.getprevious() is not None:
+            del player.getparent()[0]
+        if row is not None:
+            yield row
+
+def _txt_slices(header):
+    starts = []
+    for column in TXT_COLUMNS:
+        match = re.search(r'(?<!\S)' + re.escape(column) + r'(?!\S)', header)
+        if match is None:
+            raise ValueError(f"Coluna '{column}' nao encontrada no cabecalho do arquivo TXT")
+        starts.append(match.start())
+    ends = starts[1:] + [None]
+    return {column: slice(start, end) for column, start, end in zip(TXT_COLUMNS, starts, ends)}
+
+def iter_txt_players(stream):
+    text = io.TextIOWrapper(stream, encoding='utf-8', errors='replace')
+    slices = _txt_slices(text.readline())
+    for line in text:
+        if not line.strip():
+            continue
+        value = lambda column: line[slices[column]]
+        row = _player_row(value('ID Number'), value('Name'), value('Fed'), value('Sex'), value('Tit'),
+                          value('WTit'), value('SRtng'), value('RRtng'), value('BRtng'), value('B-day'))
+        if row is not None:
+            yield row
+
+def iter_rating_list(path):
+    """Yields player_data rows from a rating-list .zip, .xml or .txt file."""
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.namelist():
+                extension = os.path.splitext(member)[1].lower()
+                if extension in ('.xml', '.txt'):
+                    with archive.open(member) as stream:
+                        yield from (iter_xml_players(stream) if extension == '.xml' else iter_txt_players(stream))
+        return
+    with open(path, 'rb') as stream:
+        yield from (iter_xml_players(stream) if path.lower().endswith('.xml') else iter_txt_players(stream))
+
+def upsert_rating_list_rows(cursor, rows):
+    # Foto, ranking mundial e o nome da federacao vem apenas do perfil; nao apagar o que ja foi raspado.
+    # A lista traz o codigo da federacao (BRA), gravado a parte em federation_code
+    cursor.executemany('''
+    INSERT INTO player_data (fide_id, name, federation_code, b_year, sex, fide_title, std_rating, rapid_rating, blitz_rating)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(fide_id) DO UPDATE SET
+        name = excluded.name,
+        federation_code = excluded.federation_code,
+        b_year = excluded.b_year,
+        sex = excluded.sex,
+        fide_title = excluded.fide_title,
+        std_rating = excluded.std_rating,
+        rapid_rating = excluded.rapid_rating,
+        blitz_rating = excluded.blitz_rating
+    ''', rows)
+
+def import_rating_list(path, batch_size=IMPORT_BATCH_SIZE, db_path=DB_PATH):
+    """Streams the rating list into player_data through the ingest writer, one commit per batch; returns the row count."""
+    writer = get_ingest_writer(db_path)
+    imported = 0
+    started = time.monotonic()
+    # Um lote e gravado enquanto o proximo e lido; o UI e os crawlers continuam gravando entre os lotes
+    pending = None
+    batch = []
+    for row in iter_rating_list(path):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            if pending is not None:
+                pending.result()
+            pending = writer.submit(upsert_rating_list_rows, batch)
+            imported += len(batch)
+            batch = []
+            print(f"{imported} jogadores importados ({imported / (time.monotonic() - started):.0f}/s)")
+    if pending is not None:
+        pending.result()
+    if batch:
+        writer.write(upsert_rating_list_rows, batch)
+        imported += len(batch)
+    return imported
+
+def main():
+    parser = argparse.ArgumentParser(description='Import the FIDE combined rating list into player_data')
+    parser.add_argument('path', help='players_list_xml.zip, players_list.zip, or an extracted .xml/.txt file')
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    initialize_database()
+    started = time.monotonic()
+    imported = import_rating_list(args.path, args.batch_size)
+    print(f"{imported} jogadores importados em {time.monotonic() - started:.1f}s")
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,11 @@
 import streamlit as st
-from database.database_management import initialize_database, remove_duplicates_in_db
+from database.database_management import initialize_database
 from ui.streamlit_ui import user_input_sidebar, displayPlayerProfile, displayPlayerELOEvolution,\
         displayPlayerLast3Tournaments, displayPlayerPerformanceDetails, displayPlayerGamesHistory, \
         displayPlayerPerformance, getLanguage, displayDownloadDbButton
 
 # Inicializar o banco de dados e as tabelas
 initialize_database()
-remove_duplicates_in_db()
 
 # Layout
 st.set_page_config(layout="wide")
@@ -0,0 +1,165 @@
+"""Local stand-in for the FIDE endpoints used by the crawler, serving pages from a recorded corpus.
+
+Usage:
+    python -m offline_server.fide_stub_server --port 8765 --latency 0.2 --error-rate 0.05 --max-rps 20
+
+Then point the app at it:
+    FIDE_BASE_URL=http://127.0.0.1:8765 FIDE_RATINGS_BASE_URL=http://127.0.0.1:8765 streamlit run main.py
+"""
+import os
+import re
+import time
+import random
+import argparse
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+
+# Pagina devolvida pela FIDE quando nao ha calculos para o periodo
+EMPTY_CALCULATIONS_PAGE = '<html><body><div class="calc_empty">No calculations available</div></body></html>'
+
+def searchSlug(query):
+    return re.sub(r'[^a-z0-9]+', '_', query.strip().lower()).strip('_') or 'empty'
+
+# Parametro t da pagina de calculos da FIDE (sem t, a FIDE mostra o std)
+RATING_TYPES_BY_CODE = {'0': 'std', '1': 'rapid', '2': 'blitz'}
+
+def corpusPath(corpus_dir, kind, *parts):
+    return os.path.join(corpus_dir, kind, *parts) + '.html'
+
+def calculationsPath(corpus_dir, fide_id, period, rating_type='std'):
+    # std em calculations/<id>/<periodo>.html (o corpus gravado antes continua valendo);
+    # rapid e blitz em calculations/<id>/<tipo>/<periodo>.html
+    parts = (str(fide_id), period) if rating_type == 'std' else (str(fide_id), rating_type, period)
+    return corpusPath(corpus_dir, 'calculations', *parts)
+
+class StubConfig:
+    def __init__(self, corpus_dir=CORPUS_DIR, latency=0.0, jitter=0.0, error_rate=0.0, max_rps=0.0, seed=0):
+        self.corpus_dir = corpus_dir
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.max_rps = max_rps
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.window_start = time.monotonic()
+        self.window_count = 0
+        self.served = 0
+        self.errors = 0
+        self.throttled = 0
+
+    def should_throttle(self):
+        if self.max_rps <= 0:
+            return False
+        with self.lock:
+            now = time.monotonic()
+            if now - self.window_start >= 1:
+                self.window_start = now
+                self.window_count = 0
+            self.window_count += 1
+            return self.window_count > self.max_rps
+
+    def should_fail(self):
+        with self.lock:
+            return self.random.random() < self.error_rate
+
+    def delay(self):
+        with self.lock:
+            return max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+
+def make_handler(config):
+    class FideStubHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body='', headers=None):
+            data = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _resolve(self):
+            parsed = urlparse(self.path)
+            params = parse_qs(parsed.query)
+            if parsed.path.rstrip('/') == '/search':
+                query = params.get('query', [''])[0]
+                return corpusPath(config.corpus_dir, 'search', searchSlug(query)), '<html><body></body></html>'
+            match = re.match(r'^/profile/(\d+)$', parsed.path)
+            if match:
+                return corpusPath(config.corpus_dir, 'profile', match.group(1)), None
+            if parsed.path == '/a_indv_calculations.php':
+                fide_id = params.get('id_number', [''])[0]
+                period = params.get('rating_period', [''])[0]
+                rating_type = RATING_TYPES_BY_CODE.get(params.get('t', ['0'])[0])
+                if rating_type is None:
+                    return None, None
+                return calculationsPath(config.corpus_dir, fide_id, period, rating_type), EMPTY_CALCULATIONS_PAGE
+            return None, None
+
+        def do_GET(self):
+            if config.should_throttle():
+                with config.lock:
+                    config.throttled += 1
+                return self._send(429, 'Too Many Requests', {'Retry-After': '1'})
+
+            time.sleep(config.delay())
+
+            if config.should_fail():
+                with config.lock:
+                    config.errors += 1
+                return self._send(503, 'Service Unavailable')
+
+            path, fallback = self._resolve()
+            if path is not None and os.path.isfile(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    body = f.read()
+            elif fallback is not None:
+                body = fallback
+            else:
+                return self._send(404, 'Not Found')
+
+            with config.lock:
+                config.served += 1
+            self._send(200, body)
+
+    return FideStubHandler
+
+def start_server(host='127.0.0.1', port=0, **config_kwargs):
+    """Starts the stand-in server on a background thread; returns (server, base_url, config)."""
+    config = StubConfig(**config_kwargs)
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://{host}:{server.server_port}', config
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline stand-in for fide.com / ratings.fide.com')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--corpus', default=CORPUS_DIR, help='Directory with recorded pages')
+    parser.add_argument('--latency', type=float, default=0.0, help='Mean response delay in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Uniform +/- jitter added to the delay')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 503')
+    parser.add_argument('--max-rps', type=float, default=0.0, help='Requests per second before answering 429 (0 = unlimited)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    config = StubConfig(args.corpus, args.latency, args.jitter, args.error_rate, args.max_rps, args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(config))
+    print(f'Servindo {args.corpus} em http://{args.host}:{args.port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f'Respostas: {config.served}, erros: {config.errors}, 429: {config.throttled}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Records real FIDE responses into the corpus served by fide_stub_server.
+
+Usage:
+    python -m offline_server.recorder --fide-id 2093596 --start 2023-01-01 --end 2023-12-01
+    python -m offline_server.recorder --fide-id 2093596 --start 2023-01-01 --end 2023-12-01 --rating-type rapid
+    python -m offline_server.recorder --query niemann
+"""
+import os
+import argparse
+from data_processing.http_client import http_get
+from data_processing.data_fetching_processing import FIDE_BASE_URL, FIDE_RATINGS_BASE_URL, RATING_TYPE_CODES, buildRatingPeriods, ratingPeriodLink
+from offline_server.fide_stub_server import CORPUS_DIR, calculationsPath, corpusPath, searchSlug
+
+def _save(path, html):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(html)
+
+def record_search(query, corpus_dir=CORPUS_DIR):
+    response = http_get(f'{FIDE_BASE_URL}/search', params={'query': query})
+    response.raise_for_status()
+    _save(corpusPath(corpus_dir, 'search', searchSlug(query)), response.text)
+
+def record_profile(fide_id, corpus_dir=CORPUS_DIR):
+    response = http_get(f'{FIDE_RATINGS_BASE_URL}/profile/{fide_id}')
+    response.raise_for_status()
+    _save(corpusPath(corpus_dir, 'profile', str(fide_id)), response.text)
+
+def record_game_history(fide_id, startingPeriod, endPeriod, corpus_dir=CORPUS_DIR, rating_type='std', base_url=None):
+    recorded = 0
+    for period in buildRatingPeriods(startingPeriod, endPeriod):
+        response = http_get(ratingPeriodLink(fide_id, period, rating_type, base_url))
+        response.raise_for_status()
+        # Periodos sem partidas nao sao gravados; o servidor devolve a pagina vazia padrao
+        if 'calc_table' in response.text:
+            _save(calculationsPath(corpus_dir, fide_id, period, rating_type), response.text)
+            recorded += 1
+    return recorded
+
+def main():
+    parser = argparse.ArgumentParser(description='Record FIDE pages into the offline corpus')
+    parser.add_argument('--fide-id', action='append', default=[], help='FIDE ID to record (repeatable)')
+    parser.add_argument('--query', action='append', default=[], help='Search query to record (repeatable)')
+    parser.add_argument('--start', help='First rating period, YYYY-MM-DD')
+    parser.add_argument('--end', help='Last rating period, YYYY-MM-DD')
+    parser.add_argument('--rating-type', choices=list(RATING_TYPE_CODES), default='std')
+    parser.add_argument('--corpus', default=CORPUS_DIR)
+    args = parser.parse_args()
+
+    for query in args.query:
+        record_search(query, args.corpus)
+        print(f'Pesquisa gravada: {query}')
+    for fide_id in args.fide_id:
+        record_profile(fide_id, args.corpus)
+        if args.start and args.end:
+            recorded = record_game_history(fide_id, args.start, args.end, args.corpus, args.rating_type)
+            print(f'{fide_id}: perfil e {recorded} periodo(s) {args.rating_type} gravados')
+        else:
+            print(f'{fide_id}: perfil gravado')
+
+if __name__ == '__main__':
+    main()
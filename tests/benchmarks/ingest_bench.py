@@ -0,0 +1,129 @@
+"""Benchmark: game ingest throughput (rows/s) into a fresh database, one batch per player as the crawlers write.
+
+'baseline' is the code before the ingest changes: the old game_history table with TEXT columns, a new sqlite3
+connection per player with SQLite's default settings (rollback journal, synchronous=FULL) and one INSERT per
+iterrows() row. The other modes run on the current schema and connection settings (WAL, synchronous=NORMAL);
+'row-by-row' isolates the executemany batching on that schema.
+
+Run from the repository root: python tests/benchmarks/ingest_bench.py [--players N] [--games N]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import pandas as pd
+from database.connection import get_database, read_connection, write_transaction
+from database.database_management import initialize_database
+from database.ingest_writer import get_ingest_writer
+from data_processing.data_fetching_processing import gameRows, insertGameData
+
+def crawl_frame(rng, player, games):
+    # Mesmo formato do DataFrame de scrapeRatingPeriods: tudo texto, como lido da pagina
+    return pd.DataFrame({
+        'date': [f'20{10 + player % 14}-{1 + player % 12:02d}-{1 + game % 28:02d}' for game in range(games)],
+        'tournament_name': [f'Tournament {player}-{game // 9}' for game in range(games)],
+        'country': 'BRA',
+        'player_name': f'Player {player}',
+        'player_rating': '2450',
+        'player_color': [rng.choice(['white', 'black']) for _ in range(games)],
+        'opponent_name': [f'Opponent {rng.randrange(10 ** 6)}' for _ in range(games)],
+        'opponent_rating': [str(rng.randrange(1500, 2800)) for _ in range(games)],
+        'result': [rng.choice([0.0, 0.5, 1.0]) for _ in range(games)],
+        'chg': '0.10',
+        'k': '10',
+        'k_chg': '1.00',
+        'opponent_fide_id': [str(rng.randrange(10 ** 6, 10 ** 7)) for _ in range(games)],
+    })
+
+# Tabela e insercao do codigo antigo (antes da normalizacao e do executemany)
+LEGACY_GAME_HISTORY_TABLE = '''
+CREATE TABLE IF NOT EXISTS game_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fide_id TEXT,
+    date TEXT,
+    tournament_name TEXT,
+    country TEXT,
+    player_name TEXT,
+    player_rating TEXT,
+    player_color TEXT,
+    opponent_name TEXT,
+    opponent_rating TEXT,
+    result TEXT,
+    chg TEXT,
+    k TEXT,
+    k_chg TEXT
+);
+'''
+
+def create_legacy_tables(db_path):
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(LEGACY_GAME_HISTORY_TABLE)
+    conn.close()
+
+def legacy_insert(cursor, games_df, fide_id):
+    for index, row in games_df.iterrows():
+        cursor.execute("INSERT INTO game_history (fide_id, date, tournament_name, country, player_name, player_rating, player_color, opponent_name, opponent_rating, result, chg, k, k_chg) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                       (fide_id, row['date'], row['tournament_name'], row['country'], row['player_name'], row['player_rating'], row['player_color'], row['opponent_name'], row['opponent_rating'], row['result'], row['chg'], row['k'], row['k_chg']))
+
+def legacy_transactions(db_path, frames, insert):
+    # Como o antigo fetch_game_history: uma conexao nova e um commit por jogador
+    for player, games in enumerate(frames):
+        conn = sqlite3.connect(db_path)
+        insert(conn.cursor(), games, str(player))
+        conn.commit()
+        conn.close()
+
+def row_by_row(cursor, games, fide_id):
+    # Uma chamada por partida, como o antigo loop sobre iterrows()
+    for row in gameRows(games):
+        insertGameData(cursor, [row], fide_id)
+
+def per_player_transactions(db_path, frames, insert):
+    for player, games in enumerate(frames):
+        with write_transaction(db_path) as cursor:
+            insert(cursor, games, str(player))
+
+def ingest_writer(db_path, frames, insert):
+    writer = get_ingest_writer(db_path)
+    futures = [writer.submit(insert, games, str(player)) for player, games in enumerate(frames)]
+    for future in futures:
+        future.result()
+
+MODES = {
+    'baseline': (create_legacy_tables, legacy_transactions, legacy_insert),
+    'row-by-row': (initialize_database, per_player_transactions, row_by_row),
+    'executemany': (initialize_database, per_player_transactions, insertGameData),
+    'ingest-writer': (initialize_database, ingest_writer, insertGameData),
+}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--players', type=int, default=250)
+    parser.add_argument('--games', type=int, default=400, help='games per player')
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    frames = [crawl_frame(rng, player, args.games) for player in range(args.players)]
+    total = args.players * args.games
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in args.modes:
+            db_path = os.path.join(directory, f'{mode}.db')
+            create, write, insert = MODES[mode]
+            create(db_path)
+            start = time.perf_counter()
+            write(db_path, frames, insert)
+            elapsed = time.perf_counter() - start
+            # Tabela antiga ou view sobre games: uma linha por partida gravada
+            stored = read_connection(db_path).execute("SELECT COUNT(*) FROM game_history").fetchone()[0]
+            print(f'{mode:13} {total} rows in {elapsed:6.2f}s -> {total / elapsed:9,.0f} rows/s  ({stored} stored)')
+            get_database(db_path).close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""Micro-benchmark: single-pass profile parser vs. the BeautifulSoup extraction it replaced.
+
+Run from the repository root: python tests/benchmarks/profile_parser_bench.py [--repeat N]
+"""
+import argparse
+import os
+import sys
+import time
+
+TESTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.dirname(TESTS_DIR), TESTS_DIR]
+
+from data_processing.profile_parser import parseProfilePage
+from test_profile_parser import FIDE_ID, load_fixture, soup_profile
+
+def realistic_page(page):
+    # A pagina real tem <head> com scripts, menu e rodape bem maiores que o bloco do perfil
+    head = '<script>var a = 1;</script>' * 200 + '<link rel="stylesheet" href="a.css">' * 50
+    menu = '<nav><ul>' + '<li><a href="#">menu</a></li>' * 300 + '</ul></nav>'
+    footer = '<footer>' + '<div class="row"><div>link</div><div>x</div></div>' * 500 + '</footer>'
+    return page.replace('</head>', head + '</head>').replace('<body>', '<body>' + menu).replace('</body>', footer + '</body>')
+
+def seconds_per_call(parse, html, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parse(html, FIDE_ID)
+    return (time.perf_counter() - start) / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=300)
+    args = parser.parse_args()
+
+    page = load_fixture('complete')[0].decode('utf-8')
+    for label, html in (('fixture', page), ('realistic', realistic_page(page))):
+        assert parseProfilePage(html, FIDE_ID) == soup_profile(html, FIDE_ID)
+        soup = seconds_per_call(soup_profile, html, args.repeat)
+        single_pass = seconds_per_call(parseProfilePage, html, args.repeat)
+        print(f'{label:9} {len(html) / 1024:6.1f} KiB  bs4 {soup * 1e3:7.3f} ms  single-pass {single_pass * 1e3:7.3f} ms  x{soup / single_pass:.1f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,18 @@
+import os
+import sys
+import pytest
+
+# Os modulos do projeto sao importados a partir da raiz do repositorio (como em main.py)
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+FIXTURES_DIR = os.path.join(REPO_ROOT, 'tests', 'fixtures')
+
+@pytest.fixture
+def db_path(tmp_path):
+    """A fresh database file with the current schema (all migrations applied)."""
+    from database.database_management import initialize_database
+    path = str(tmp_path / 'fide_data.db')
+    initialize_database(path)
+    return path
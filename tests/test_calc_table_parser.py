@@ -0,0 +1,84 @@
+"""Single-pass calc_table parser: parity with the pd.read_html version on the pages it handled, plus the intended changes.
+
+colspan, multi_tournament and accented are pages the pd.read_html version parsed; their .json records are checked
+against it (all fields but opponent_fide_id, which it did not read). footer_and_forfeit holds what it could not parse:
+the '*  Rating difference of more than 400.' footer, which read_html reads with a single space so it was never dropped
+(IndexError), and a '+' forfeit row (ValueError); its .json is the intended output of the new parser.
+"""
+import json
+import os
+from io import StringIO
+import pytest
+from conftest import FIXTURES_DIR
+from data_processing.calc_table_parser import GameRecord, parseCalcTable
+
+CALC_TABLE_FIXTURES = os.path.join(FIXTURES_DIR, 'calc_table')
+PLAYER_NAME = 'Player, Test'
+
+def load_fixture(name):
+    with open(os.path.join(CALC_TABLE_FIXTURES, f'{name}.html'), 'rb') as f:
+        page = f.read()
+    with open(os.path.join(CALC_TABLE_FIXTURES, f'{name}.json'), encoding='utf-8') as f:
+        expected = [GameRecord(**record) for record in json.load(f)]
+    return page, expected
+
+def read_html_records(html, playerName):
+    """The pd.read_html loop of scrapePlayerGamesHistory (without its bare except), kept as the reference for parity."""
+    import pandas as pd
+    from bs4 import BeautifulSoup
+    fullTable = BeautifulSoup(html, 'html.parser').find('table', attrs={'class': 'calc_table'})
+    tableDf = pd.read_html(StringIO(fullTable.prettify()))[0]
+    tableDf.drop(tableDf.index[tableDf['Unnamed: 0'] == "*  Rating difference of more than 400."], inplace=True)
+    tableDf.reset_index(inplace=True, drop=True)
+    limiters = tableDf.isnull().all(1)
+    limiters = limiters[limiters == True].index.values.tolist()
+    colors = ['white' if 'clr_wh' in img.get('src') else 'black' for img in fullTable.find_all('img')]
+    records = []
+    for n, limiter in enumerate(limiters):
+        tournamentName, tournamentDate, playerRating = tableDf.iloc[limiter - 3, 0], tableDf.iloc[limiter - 3, 7], tableDf.iloc[limiter - 1, 1]
+        localTable = tableDf.iloc[limiter + 1:limiters[n + 1] - 3, :] if n < len(limiters) - 1 else tableDf.iloc[limiter + 1:, :]
+        for _, row in localTable.iterrows():
+            records.append((tournamentDate, tournamentName, row['Unnamed: 4'], playerName, playerRating, colors[len(records)],
+                            row['Unnamed: 0'], row['Unnamed: 3'], float(row['Unnamed: 5']), row['Unnamed: 7'], row['Unnamed: 8'], row['Unnamed: 9']))
+    return records
+
+@pytest.mark.parametrize('name', ['colspan', 'multi_tournament', 'accented'])
+def test_matches_the_read_html_parser(name):
+    pytest.importorskip('bs4')
+    page, expected = load_fixture(name)
+    assert read_html_records(page.decode('utf-8'), PLAYER_NAME) == [tuple(record[:-1]) for record in expected]
+
+def test_footer_and_forfeit_rows_are_skipped():
+    pytest.importorskip('bs4')
+    page, expected = load_fixture('footer_and_forfeit')
+    # A versao com read_html nao reconhecia o rodape e parava no '+' do W.O.
+    with pytest.raises((IndexError, ValueError)):
+        read_html_records(page.decode('utf-8'), PLAYER_NAME)
+    assert parseCalcTable(page, PLAYER_NAME) == expected
+    assert [record.opponent_name for record in expected] == ['Robson, Ray', 'Weak, Opponent']
+
+@pytest.mark.parametrize('name', ['colspan', 'multi_tournament', 'accented', 'footer_and_forfeit'])
+def test_parses_expected_records(name):
+    page, expected = load_fixture(name)
+    # O scraper passa response.text; o cache e o backfill podem passar os bytes
+    assert parseCalcTable(page.decode('utf-8'), PLAYER_NAME) == expected
+    assert parseCalcTable(page, PLAYER_NAME) == expected
+
+def test_bytes_without_charset_are_read_as_utf8():
+    page, expected = load_fixture('accented')
+    assert parseCalcTable(page.replace(b'<meta charset="utf-8">', b''), PLAYER_NAME) == expected
+
+def test_rows_of_each_tournament_keep_their_header():
+    page, _ = load_fixture('multi_tournament')
+    records = parseCalcTable(page, PLAYER_NAME)
+    assert [(record.tournament_name, record.date) for record in records] == [
+        ('Titled Tuesday Cup', '2023-05-02'), ('Titled Tuesday Cup', '2023-05-02'),
+        ('US Masters', '2023-05-15'), ('US Masters', '2023-05-15'),
+    ]
+
+@pytest.mark.parametrize('page', [
+    '<html><body>No calculations for this period</body></html>',
+    '<html><body><table class="other"><tr><td>x</td></tr></table></body></html>',
+])
+def test_pages_without_calc_table_have_no_games(page):
+    assert parseCalcTable(page, PLAYER_NAME) == []
@@ -0,0 +1,91 @@
+"""The per-player, opponent and tournament reads on the game_history view must stay index lookups (O(log n))."""
+import re
+import pytest
+from database.connection import read_connection, write_transaction
+from database.database_management import SCHEMA_VERSION, migrate_schema
+from database.game_store import store_games
+
+PLAYER_DATE_RANGE = ("SELECT * FROM game_history WHERE fide_id = ? AND rating_type = ? AND date BETWEEN ? AND ?",
+                     ('2093596', 'std', '2023-01-01', '2023-12-01'))
+PLAYER_OPPONENTS = ('''SELECT opponent_fide_id, MAX(opponent_rating), COUNT(*) FROM game_history
+                       WHERE fide_id = ? AND opponent_fide_id IS NOT NULL AND opponent_fide_id != ? GROUP BY opponent_fide_id''',
+                    ('2093596', '2093596'))
+OPPONENT_BY_NAME = ("SELECT * FROM game_history WHERE opponent_name = ?", ('Carlsen, Magnus',))
+OPPONENT_BY_ID = ("SELECT * FROM game_history WHERE opponent_fide_id = ?", ('1503014',))
+TOURNAMENT = ("SELECT * FROM game_history WHERE tournament_name = ? AND date = ?", ('Tournament 3', '2023-04-01'))
+
+# Tabelas por tras da view e os apelidos usados em GAME_HISTORY_VIEW
+BASE_TABLES = {'games', 'players', 'tournaments', 'g', 'w', 'b', 't'}
+
+def query_plan(db_path, query, params):
+    return [row[3] for row in read_connection(db_path).execute('EXPLAIN QUERY PLAN ' + query, params)]
+
+def full_scans(plan):
+    scans = [re.match(r'SCAN (\w+)', step) for step in plan]
+    return [scan.group(1) for scan in scans if scan and scan.group(1) in BASE_TABLES]
+
+def fill_games(db_path, players=40, tournaments=30, rounds=9):
+    # Como nos dados reais: muitos torneios com poucas partidas de cada jogador, para o ANALYZE ter estatisticas realistas
+    with write_transaction(db_path) as cursor:
+        for player in range(players):
+            rows = []
+            for tournament in range(tournaments):
+                for round_number in range(rounds):
+                    opponent = (player + round_number + 1) % players
+                    rows.append((f'2023-{tournament % 12 + 1:02d}-01', f'Tournament {player * tournaments + tournament}', 'NOR', f'Player {player}', 2500,
+                                 'white' if round_number % 2 else 'black', f'Player {opponent}', 2400 + opponent, 1.0, 5.0, 10, 50.0,
+                                 str(1000 + opponent)))
+            store_games(cursor, str(1000 + player), rows)
+        cursor.execute("ANALYZE")
+
+@pytest.fixture(params=['empty', 'analyzed'])
+def plan_db(request, db_path):
+    # Os planos sao os do esquema final, com todas as migracoes aplicadas
+    assert read_connection(db_path).execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    if request.param == 'analyzed':
+        fill_games(db_path)
+    return db_path
+
+@pytest.mark.parametrize('query, params', [PLAYER_DATE_RANGE, PLAYER_OPPONENTS, OPPONENT_BY_NAME, OPPONENT_BY_ID, TOURNAMENT])
+def test_reads_never_scan_base_tables(plan_db, query, params):
+    plan = query_plan(plan_db, query, params)
+    assert full_scans(plan) == [], plan
+
+def test_player_reads_use_the_player_game_indexes(plan_db):
+    for query, params in (PLAYER_DATE_RANGE, PLAYER_OPPONENTS):
+        plan = ' | '.join(query_plan(plan_db, query, params))
+        assert 'sqlite_autoindex_players_1 (fide_id=?)' in plan
+        assert 'USING INDEX idx_games_white_date (white_id=?' in plan
+        assert 'USING INDEX idx_games_black_date (black_id=?' in plan
+
+def test_date_range_is_an_index_range(plan_db):
+    # Partidas fora do intervalo nao sao lidas: a data faz parte da busca no indice
+    plan = ' | '.join(query_plan(plan_db, *PLAYER_DATE_RANGE))
+    assert 'idx_games_white_date (white_id=? AND date>? AND date<?)' in plan
+    assert 'idx_games_black_date (black_id=? AND date>? AND date<?)' in plan
+
+def test_opponent_name_read_uses_the_name_index(plan_db):
+    plan = ' | '.join(query_plan(plan_db, *OPPONENT_BY_NAME))
+    assert 'USING INDEX idx_players_name (name=?)' in plan
+
+def test_tournament_read_uses_the_tournament_key(plan_db):
+    plan = ' | '.join(query_plan(plan_db, *TOURNAMENT))
+    assert 'sqlite_autoindex_tournaments_1 (name=?)' in plan
+    assert 'sqlite_autoindex_games_1 (tournament_id=?)' in plan
+
+def test_migration_dates_the_stored_games(db_path):
+    fill_games(db_path, players=3, tournaments=2, rounds=2)
+    with write_transaction(db_path) as cursor:
+        # Banco da versao 9: games sem a data e com os indices (jogador, torneio)
+        cursor.execute("UPDATE games SET date = NULL")
+        cursor.execute("DROP INDEX idx_games_white_date")
+        cursor.execute("DROP INDEX idx_games_black_date")
+        cursor.execute("CREATE INDEX idx_games_white ON games(white_id, tournament_id)")
+        cursor.execute("PRAGMA user_version = 9")
+        migrate_schema(cursor)
+    reader = read_connection(db_path)
+    assert reader.execute("SELECT COUNT(*) FROM games g JOIN tournaments t ON t.id = g.tournament_id WHERE g.date IS t.date").fetchone()[0] == 12
+    assert reader.execute("SELECT COUNT(*) FROM game_history WHERE fide_id = ? AND rating_type = ? AND date BETWEEN ? AND ?", PLAYER_DATE_RANGE[1]).fetchone()[0] == 0
+    assert reader.execute("SELECT COUNT(*) FROM game_history WHERE fide_id = '1000' AND date BETWEEN '2023-01-01' AND '2023-02-01'").fetchone()[0] == 4
+    assert 'idx_games_white_date (white_id=? AND date>? AND date<?)' in ' | '.join(query_plan(db_path, *PLAYER_DATE_RANGE))
+    assert 'idx_games_white' not in [row[0] for row in reader.execute("SELECT name FROM sqlite_master WHERE type = 'index'")]
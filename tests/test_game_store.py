@@ -0,0 +1,42 @@
+"""Normalized games: identical pairings of one tournament stay separate games."""
+from database.connection import read_connection, write_transaction
+from database.database_management import migrate_schema
+from database.game_store import GAMES_TABLE, store_games
+
+def game(player_name, player_color, opponent_name, opponent_fide_id, result):
+    return ('2023-04-20', 'Rapid Match', 'NOR', player_name, 2800, player_color, opponent_name, 2750, result, 0.1, 10, 1.0, opponent_fide_id)
+
+# Match de duas partidas com as mesmas cores e o mesmo resultado
+CARLSEN_PAGE = [game('Carlsen, Magnus', 'white', 'Caruana, Fabiano', '2020009', 0.5)] * 2
+CARUANA_PAGE = [game('Caruana, Fabiano', 'black', 'Carlsen, Magnus', '1503014', 0.5)] * 2
+
+def games(db_path):
+    return read_connection(db_path).execute("SELECT game_seq, white_seen, black_seen FROM games ORDER BY game_seq").fetchall()
+
+def test_identical_pairings_are_kept_apart(db_path):
+    with write_transaction(db_path) as cursor:
+        store_games(cursor, '1503014', CARLSEN_PAGE)
+    assert games(db_path) == [(1, 1, 0), (2, 1, 0)]
+    # A mesma pagina gravada de novo e a pagina do oponente caem nas mesmas duas partidas
+    with write_transaction(db_path) as cursor:
+        store_games(cursor, '1503014', CARLSEN_PAGE)
+        store_games(cursor, '2020009', CARUANA_PAGE)
+    assert games(db_path) == [(1, 1, 1), (2, 1, 1)]
+    history = read_connection(db_path).execute("SELECT fide_id, COUNT(*) FROM game_history GROUP BY fide_id").fetchall()
+    assert history == [('1503014', 2), ('2020009', 2)]
+
+def test_migration_adds_the_sequence_to_the_key(db_path):
+    with write_transaction(db_path) as cursor:
+        store_games(cursor, '1503014', CARLSEN_PAGE[:1])
+        # Banco da versao 8: games sem game_seq
+        cursor.execute("DROP VIEW game_history")
+        v8_table = GAMES_TABLE.replace("    game_seq INTEGER NOT NULL DEFAULT 1,\n", "").replace("    date TEXT,\n", "").replace(", game_seq)", ")")
+        cursor.execute(v8_table.format(table='games_v8'))
+        cursor.execute("INSERT INTO games_v8 SELECT id, tournament_id, white_id, black_id, white_result, white_rating, black_rating, white_federation, black_federation, "
+                       "white_chg, white_k, white_k_chg, black_chg, black_k, black_k_chg, white_seen, black_seen FROM games")
+        cursor.execute("DROP TABLE games")
+        cursor.execute("ALTER TABLE games_v8 RENAME TO games")
+        cursor.execute("PRAGMA user_version = 8")
+        migrate_schema(cursor)
+        store_games(cursor, '1503014', CARLSEN_PAGE)
+    assert games(db_path) == [(1, 1, 0), (2, 1, 0)]
@@ -0,0 +1,53 @@
+"""On-disk HTML cache: hits do not write to the index, but the LRU order still sees them."""
+import os
+import sqlite3
+import pytest
+from data_processing.html_cache import HtmlCache
+
+PAGE = '<html><body>' + 'Đukić, Željko ' * 200 + '</body></html>'
+
+@pytest.fixture
+def cache(tmp_path):
+    return HtmlCache(str(tmp_path / 'cache'))
+
+def last_access(cache, url):
+    return cache._conn.execute("SELECT last_access FROM entries WHERE url = ?", (url,)).fetchone()[0]
+
+def test_index_uses_wal(cache):
+    assert cache._conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    assert cache._conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+
+def test_hits_are_written_in_batches(cache):
+    cache.put('a', PAGE)
+    stored_at = last_access(cache, 'a')
+    assert cache.get('a') == PAGE
+    assert last_access(cache, 'a') == stored_at
+    cache.flush()
+    assert last_access(cache, 'a') > stored_at
+    assert cache.stats()['hits'] == 1
+
+def test_eviction_sees_pending_hits(cache):
+    for url in ('a', 'b', 'c'):
+        cache.put(url, PAGE + url)
+    # 'a' foi lida depois de 'b' e 'c' serem gravadas; o acesso ainda so existe em memoria
+    assert cache.get('a') is not None
+    cache.max_bytes = cache.stats()['bytes']
+    cache.put('d', PAGE + 'd')
+    assert 'a' in cache.urls()
+    assert 'b' not in cache.urls()
+
+def test_missing_blob_is_a_miss(cache):
+    cache.put('a', PAGE)
+    content_hash, = cache._conn.execute("SELECT content_hash FROM entries WHERE url = 'a'").fetchone()
+    os.remove(cache._blob_path(content_hash))
+    assert cache.get('a') is None
+    assert cache.urls() == []
+    assert cache.stats()['misses'] == 1
+
+def test_index_is_shared_between_instances(tmp_path):
+    first = HtmlCache(str(tmp_path / 'cache'))
+    first.put('a', PAGE)
+    first.get('a')
+    first.flush()
+    assert HtmlCache(str(tmp_path / 'cache')).get('a') == PAGE
+    assert sqlite3.connect(str(tmp_path / 'cache' / 'index.db')).execute("SELECT COUNT(*) FROM entries").fetchone()[0] == 1
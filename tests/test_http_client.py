@@ -0,0 +1,33 @@
+"""Retries of the shared HTTP client and what the profile scrape does once they are exhausted."""
+import pytest
+import requests
+from data_processing.http_client import HTTP_BACKOFF_MAX, _retry_after_seconds
+from database.connection import read_connection
+
+def response_with(headers):
+    response = requests.Response()
+    response.headers.update(headers)
+    return response
+
+@pytest.mark.parametrize('value, seconds', [
+    ('5', 5.0),
+    ('-3', 0.0),
+    ('86400', HTTP_BACKOFF_MAX),
+    ('Wed, 21 Oct 2099 07:28:00 GMT', HTTP_BACKOFF_MAX),
+    ('Wed, 21 Oct 2015 07:28:00 GMT', 0.0),
+    ('soon', None),
+])
+def test_retry_after_is_clamped(value, seconds):
+    assert _retry_after_seconds(response_with({'Retry-After': value})) == seconds
+
+def test_failed_profile_is_shown_as_not_found_and_not_stored(db_path, monkeypatch):
+    pytest.importorskip('streamlit')
+    from data_processing import data_fetching_processing as dfp
+
+    def http_get(url, **kwargs):
+        raise requests.HTTPError('503 Server Error')
+    monkeypatch.setattr(dfp, 'http_get', http_get)
+    monkeypatch.setattr(dfp, 'read_connection', lambda: read_connection(db_path))
+    monkeypatch.setattr(dfp, 'get_ingest_writer', lambda: pytest.fail('a profile that was not read must not be stored'))
+    player_data = dfp.fetch_player_data('14109603')
+    assert (player_data['fide_id'], player_data['name']) == ('14109603', '')
@@ -0,0 +1,59 @@
+"""The offline stand-in serves and records calculation pages per rating type."""
+from pathlib import Path
+import pytest
+import requests
+from offline_server.fide_stub_server import EMPTY_CALCULATIONS_PAGE, calculationsPath, start_server
+
+PAGES = {
+    'std': '<html><body><table class="calc_table"><tr><td>std</td></tr></table></body></html>',
+    'rapid': '<html><body><table class="calc_table"><tr><td>rapid</td></tr></table></body></html>',
+}
+
+def write_page(path, html):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(html, encoding='utf-8')
+
+@pytest.fixture
+def corpus(tmp_path):
+    corpus_dir = tmp_path / 'corpus'
+    for rating_type, html in PAGES.items():
+        write_page(Path(calculationsPath(str(corpus_dir), '2093596', '2023-04-01', rating_type)), html)
+    return corpus_dir
+
+@pytest.fixture
+def stub(corpus):
+    server, base_url, _ = start_server(corpus_dir=str(corpus))
+    yield base_url
+    server.shutdown()
+
+def calculations(base_url, query):
+    response = requests.get(f'{base_url}/a_indv_calculations.php?id_number=2093596&rating_period=2023-04-01{query}', timeout=5)
+    return response.status_code, response.text
+
+def test_std_pages_keep_the_original_corpus_layout(corpus):
+    assert (corpus / 'calculations' / '2093596' / '2023-04-01.html').is_file()
+    assert (corpus / 'calculations' / '2093596' / 'rapid' / '2023-04-01.html').is_file()
+
+def test_pages_are_served_by_rating_type(stub):
+    assert calculations(stub, '&t=0') == (200, PAGES['std'])
+    assert calculations(stub, '') == (200, PAGES['std'])
+    assert calculations(stub, '&t=1') == (200, PAGES['rapid'])
+    # Periodo sem pagina gravada: a pagina vazia da FIDE, nunca a de outro tipo de rating
+    assert calculations(stub, '&t=2') == (200, EMPTY_CALCULATIONS_PAGE)
+    assert calculations(stub, '&t=7')[0] == 404
+
+def test_recorder_keeps_rating_types_apart(stub, tmp_path):
+    pytest.importorskip('streamlit')
+    from data_processing.data_fetching_processing import ratingPeriodLink
+    from offline_server.recorder import record_game_history
+    recorded_dir = str(tmp_path / 'recorded')
+    for rating_type in ('std', 'rapid', 'blitz'):
+        record_game_history('2093596', '2023-03-01', '2023-04-01', recorded_dir, rating_type, base_url=stub)
+
+    server, replay, _ = start_server(corpus_dir=recorded_dir)
+    try:
+        for rating_type, html in PAGES.items():
+            assert requests.get(ratingPeriodLink('2093596', '2023-04-01', rating_type, replay), timeout=5).text == html
+        assert requests.get(ratingPeriodLink('2093596', '2023-04-01', 'blitz', replay), timeout=5).text == EMPTY_CALCULATIONS_PAGE
+    finally:
+        server.shutdown()
@@ -0,0 +1,26 @@
+"""Fuzzy backfill of opponents stored without a FIDE ID."""
+import pytest
+from database.connection import read_connection, write_transaction
+from database.game_store import store_games
+
+pytest.importorskip('streamlit')
+from data_processing.opponent_backfill import backfill_from_player_data
+
+def game(tournament, opponent_name, opponent_federation):
+    return ('2023-04-20', tournament, opponent_federation, 'Me, Player', 2500, 'white', opponent_name, 2400, 1.0, 0.1, 10, 1.0, None)
+
+def opponent_ids(db_path):
+    return dict(read_connection(db_path).execute("SELECT opponent_name, opponent_fide_id FROM game_history WHERE fide_id = '1'"))
+
+def test_namesakes_are_told_apart_by_federation_code(db_path):
+    with write_transaction(db_path) as cursor:
+        # Lista de rating importada: so o codigo da federacao; um dos homonimos tambem tem o perfil raspado
+        cursor.executemany("INSERT INTO player_data (fide_id, name, federation, federation_code) VALUES (?, ?, ?, ?)", [
+            ('10', 'Smith, John', None, 'ENG'),
+            ('11', 'Smith, John', 'United States of America', 'USA'),
+            ('30', 'Roe, Richard', None, 'GER'),
+            ('31', 'Roe, Richard', None, 'GER'),
+        ])
+        store_games(cursor, '1', [game('Cup', 'Smith, John', 'USA'), game('Cup', 'Roe, Richard', 'GER')])
+    assert backfill_from_player_data(db_path) == 1
+    assert opponent_ids(db_path) == {'Smith, John': '11', 'Roe, Richard': None}
@@ -0,0 +1,66 @@
+"""Incremental refresh of the player name index: updates replace entries instead of adding new ones."""
+from database.connection import read_connection, write_transaction
+from database.database_management import migrate_schema, upsert_player_data
+from database.rating_list_import import upsert_rating_list_rows
+from data_processing.player_index import PlayerNameIndex
+
+def import_rows(db_path, rows):
+    with write_transaction(db_path) as cursor:
+        upsert_rating_list_rows(cursor, rows)
+
+def rating_list_row(fide_id, name, std_rating, title='Grandmaster'):
+    return (fide_id, name, 'NOR', 1990, 'Male', title, std_rating, None, None)
+
+def scraped_profile(fide_id, name, std_rating):
+    return {'fide_id': fide_id, 'name': name, 'federation': 'Norway', 'fide_title': 'Grandmaster', 'std_rating': std_rating}
+
+def test_updated_players_replace_their_entry(db_path):
+    import_rows(db_path, [rating_list_row('1503014', 'Carlsen, Magnus', 2830), rating_list_row('1500000', 'Carlsson, Mats', 2100, None)])
+    index = PlayerNameIndex(db_path)
+    assert [result[1:] for result in index.search('Carlsen, Magnus')] == [('1503014', 'Carlsen, Magnus', 'Grandmaster', 2830)]
+
+    # Lista do mes seguinte e perfis raspados de novo: as linhas mudam no lugar
+    for month in range(5):
+        import_rows(db_path, [rating_list_row('1503014', 'Carlsen, Magnus', 2831 + month)])
+        with write_transaction(db_path) as cursor:
+            upsert_player_data(cursor, scraped_profile('1503014', 'Carlsen, Magnus', 2831 + month))
+    assert [result[1:] for result in index.search('Carlsen, Magnus')] == [('1503014', 'Carlsen, Magnus', 'Grandmaster', 2835)]
+    assert len(index) == 2
+    assert len(index._players) == 2
+
+def test_renamed_players_are_found_only_by_the_new_name(db_path):
+    import_rows(db_path, [rating_list_row('2000001', 'Smith, Anna', 2200), rating_list_row('2000002', 'Jones, Bob', 2100)])
+    index = PlayerNameIndex(db_path)
+    index.refresh()
+    for name in ('Smith-Brown, Anna', 'Brown, Anna', 'Brown, Anna Maria'):
+        import_rows(db_path, [rating_list_row('2000001', name, 2200)])
+        index.refresh()
+    assert [result[1:3] for result in index.search('Smith, Anna')] == [('2000001', 'Brown, Anna Maria')]
+    assert [result[1:3] for result in index.search('Brown, Anna Maria')] == [('2000001', 'Brown, Anna Maria')]
+    # Entradas antigas sao descartadas quando passam a ser maioria
+    assert len(index) == 2
+    assert len(index._players) <= 2 * len(index)
+
+def test_unchanged_rows_are_not_read_again(db_path):
+    rows = [rating_list_row(str(3000000 + n), f'Player {n}, Test', 2000 + n) for n in range(50)]
+    import_rows(db_path, rows)
+    index = PlayerNameIndex(db_path)
+    index.refresh()
+    last_seq = index._last_seq
+    # A mesma lista importada de novo nao altera nome, titulo nem rating
+    import_rows(db_path, rows)
+    assert read_connection(db_path).execute("SELECT MAX(index_seq) FROM player_data").fetchone()[0] == last_seq
+
+def test_migration_seeds_the_sequence_of_existing_players(db_path):
+    import_rows(db_path, [rating_list_row('1503014', 'Carlsen, Magnus', 2830)])
+    with write_transaction(db_path) as cursor:
+        # Banco da versao 7: sem index_seq nem triggers
+        cursor.execute("DROP TRIGGER player_data_index_seq_insert")
+        cursor.execute("DROP TRIGGER player_data_index_seq_update")
+        cursor.execute("UPDATE player_data SET index_seq = NULL")
+        cursor.execute("PRAGMA user_version = 7")
+        migrate_schema(cursor)
+    index = PlayerNameIndex(db_path)
+    assert [result[1] for result in index.search('Carlsen')] == ['1503014']
+    import_rows(db_path, [rating_list_row('1503014', 'Carlsen, Magnus', 2840)])
+    assert index.search('Carlsen')[0][4] == 2840
@@ -0,0 +1,62 @@
+"""Parity of the single-pass profile parser with the BeautifulSoup extraction it replaced."""
+import json
+import os
+import pytest
+from conftest import FIXTURES_DIR
+from data_processing.profile_parser import parseProfilePage
+
+PROFILE_FIXTURES = os.path.join(FIXTURES_DIR, 'profile')
+FIDE_ID = '14109603'
+
+def load_fixture(name):
+    with open(os.path.join(PROFILE_FIXTURES, f'{name}.html'), 'rb') as f:
+        page = f.read()
+    with open(os.path.join(PROFILE_FIXTURES, f'{name}.json'), encoding='utf-8') as f:
+        return page, json.load(f)
+
+def soup_profile(html, fide_id):
+    """The BeautifulSoup version of scrapePlayerData, kept as the reference for parity."""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+
+    def safe_extract(extract, default=''):
+        try:
+            return extract()
+        except Exception:
+            return default
+
+    player_data = {'fide_id': fide_id}
+    player_data['name'] = safe_extract(lambda: soup.find('div', class_='profile-top-title').text.strip())
+    for label, key in (('World Rank (Active):', 'world_rank'), ('Federation:', 'federation'), ('B-Year:', 'b_year'), ('Sex:', 'sex'), ('FIDE title:', 'fide_title')):
+        player_data[key] = safe_extract(lambda: soup.find('div', string=label).find_next_sibling('div').text)
+
+    def get_profile_photo():
+        profile_photo_div = soup.find('div', class_='profile-top__photo')
+        img_tag = profile_photo_div.find('img') if profile_photo_div else None
+        return img_tag['src'] if img_tag else None
+    player_data['profile_photo'] = safe_extract(get_profile_photo)
+
+    for rating in soup.select('.profile-top-rating-data'):
+        rating_type = safe_extract(lambda: rating.find('span').text.strip().lower())
+        player_data[f'{rating_type}_rating'] = safe_extract(lambda: ''.join(filter(str.isdigit, rating.text)))
+    return player_data
+
+FIXTURES = ['complete', 'missing_photo', 'not_found']
+
+@pytest.mark.parametrize('name', FIXTURES)
+def test_parses_expected_profile(name):
+    page, expected = load_fixture(name)
+    assert parseProfilePage(page.decode('utf-8'), FIDE_ID) == expected
+    assert parseProfilePage(page, FIDE_ID) == expected
+
+@pytest.mark.parametrize('name', FIXTURES)
+def test_matches_beautifulsoup_extraction(name):
+    pytest.importorskip('bs4')
+    page, _ = load_fixture(name)
+    html = page.decode('utf-8')
+    assert parseProfilePage(html, FIDE_ID) == soup_profile(html, FIDE_ID)
+
+def test_labels_outside_the_profile_are_ignored():
+    # O rodape da pagina completa tambem tem um rotulo 'Federation:'
+    page, _ = load_fixture('complete')
+    assert parseProfilePage(page, FIDE_ID)['federation'] == 'Serbia'
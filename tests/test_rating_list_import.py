@@ -0,0 +1,73 @@
+"""Rating-list import next to scraped profiles: federation codes and names stay apart."""
+import os
+import pytest
+from conftest import FIXTURES_DIR
+from database.connection import read_connection, write_transaction
+from database.database_management import get_player_data, migrate_schema, upsert_player_data
+from database.ingest_writer import get_ingest_writer
+from database.rating_list_import import import_rating_list, iter_rating_list
+
+PLAYERS_LIST = os.path.join(FIXTURES_DIR, 'rating_list', 'players_list.xml')
+PLAYERS_LIST_TXT = os.path.join(FIXTURES_DIR, 'rating_list', 'players_list_foa.txt')
+
+SCRAPED_PROFILE = {
+    'fide_id': '2100001', 'name': 'Silva, Ana Luisa', 'world_rank': '', 'federation': 'Brazil', 'b_year': '2008',
+    'sex': 'Female', 'fide_title': 'None', 'profile_photo': None, 'std_rating': '1874', 'rapid_rating': '', 'blitz_rating': '',
+}
+
+def federations(db_path):
+    return dict((fide_id, (federation, code)) for fide_id, federation, code in
+                read_connection(db_path).execute("SELECT fide_id, federation, federation_code FROM player_data"))
+
+def test_import_stores_the_federation_code(db_path):
+    assert import_rating_list(PLAYERS_LIST, db_path=db_path) == 4
+    assert federations(db_path) == {'2100001': (None, 'BRA'), '2100002': (None, 'BRA'), '14109603': (None, 'SRB'), '8602980': (None, 'CHN')}
+
+@pytest.mark.parametrize('path', [PLAYERS_LIST, PLAYERS_LIST_TXT])
+def test_women_titles_are_used_when_there_is_no_open_title(path):
+    titles = {row[0]: row[5] for row in iter_rating_list(path)}
+    assert titles['2100001'] == 'Woman FIDE Master'
+    assert titles['2100002'] == 'Grandmaster'
+    assert titles['8602980'] == 'Grandmaster'
+
+def test_each_batch_is_its_own_ingest_job(db_path):
+    # Cada lote e gravado e confirmado a parte, entre os trabalhos do UI e dos crawlers
+    jobs = get_ingest_writer(db_path).stats()['jobs']
+    assert import_rating_list(PLAYERS_LIST, batch_size=3, db_path=db_path) == 4
+    assert get_ingest_writer(db_path).stats()['jobs'] - jobs == 2
+    assert len(federations(db_path)) == 4
+
+@pytest.mark.parametrize('scrape_first', [True, False])
+def test_profile_and_import_keep_both_representations(db_path, scrape_first):
+    if scrape_first:
+        with write_transaction(db_path) as cursor:
+            upsert_player_data(cursor, SCRAPED_PROFILE)
+        import_rating_list(PLAYERS_LIST, db_path=db_path)
+    else:
+        import_rating_list(PLAYERS_LIST, db_path=db_path)
+        with write_transaction(db_path) as cursor:
+            upsert_player_data(cursor, SCRAPED_PROFILE)
+    assert federations(db_path)['2100001'] == ('Brazil', 'BRA')
+    player_data = get_player_data(read_connection(db_path).cursor(), '2100001')
+    assert (player_data['federation'], player_data['federation_code']) == ('Brazil', 'BRA')
+
+def test_migration_moves_imported_codes_out_of_federation(db_path):
+    import_rating_list(PLAYERS_LIST, db_path=db_path)
+    with write_transaction(db_path) as cursor:
+        upsert_player_data(cursor, SCRAPED_PROFILE)
+        # Banco da versao 6: o importador gravava o codigo em federation
+        cursor.execute("UPDATE player_data SET federation = federation_code, federation_code = NULL WHERE fide_id != '2100001'")
+        cursor.execute("UPDATE player_data SET federation_code = NULL")
+        cursor.execute("PRAGMA user_version = 6")
+        migrate_schema(cursor)
+    assert federations(db_path) == {'2100001': ('Brazil', None), '2100002': (None, 'BRA'), '14109603': (None, 'SRB'), '8602980': (None, 'CHN')}
+
+def test_batch_crawl_selects_a_federation_by_code_or_name(db_path):
+    pytest.importorskip('streamlit')
+    from crawler.batch_crawl import ids_by_federation
+    import_rating_list(PLAYERS_LIST, db_path=db_path)
+    with write_transaction(db_path) as cursor:
+        upsert_player_data(cursor, SCRAPED_PROFILE)
+    cursor = read_connection(db_path).cursor()
+    assert ids_by_federation(cursor, 'bra') == ['2100001', '2100002']
+    assert ids_by_federation(cursor, 'Brazil') == ['2100001']
@@ -5,24 +5,35 @@ from io import BytesIO
 from datetime import datetime
 from dateutil import relativedelta
 from localization.localization import load_localization
+from database.connection import get_database
 from data_processing.data_fetching_processing import fetch_players
-from data_processing.data_fetching_processing import fetch_player_data, fetch_game_history, process_game_history
+from data_processing.data_fetching_processing import fetch_player_data, fetch_game_history, process_game_history, fetch_profile_photo
+from data_processing.performance_rating import tournamentPerformance
 from visualizations.visualization import plot_rating_time_series, create_pie_chart, create_enhanced_bar_chart
 import pandas as pd
 import os
 
-def displayProfilePhoto(base64_image):
-    # Remover o prefixo da string Base64
-    base64_image = base64_image.split(",")[1]
+def displayProfilePhoto(player_data):
+    # Miniatura já redimensionada no banco: entregar os bytes direto, sem decodificar
+    image_data = fetch_profile_photo(player_data)
+    if image_data is not None:
+        st.image(image_data, width=350)
+        return
+
+    # Foto ainda em base64 (perfil não salvo)
+    base64_image = player_data.get('profile_photo') or ''
+    if base64_image.startswith('data:'):
+        # Remover o prefixo da string Base64
+        base64_image = base64_image.split(",")[1]
 
-    # Decodificar a string Base64
-    image_data = base64.b64decode(base64_image)
+        # Decodificar a string Base64
+        image_data = base64.b64decode(base64_image)
 
-    # Converter para uma imagem PIL
-    image = Image.open(BytesIO(image_data))
+        # Converter para uma imagem PIL
+        image = Image.open(BytesIO(image_data))
 
-    # Exibir a imagem no Streamlit
-    st.image(image, width=350)
+        # Exibir a imagem no Streamlit
+        st.image(image, width=350)
 
 def metric_card(title, value, col):
     col.markdown(f"""
@@ -108,10 +119,10 @@ def displayPlayerProfile(players, selected_option, starting_date, end_date, loca
         col1, col2, col3 = st.columns([1, 1, 1])
         
         with col1:
-            displayProfilePhoto(player_data.get('profile_photo', 'N/A'))
+            displayProfilePhoto(player_data)
 
         metric_card(localization_data['player_name'], player_data.get('name', 'N/A'), col2)
-        metric_card(localization_data['player_federation'], player_data.get('federation', 'N/A'), col2)
+        metric_card(localization_data['player_federation'], player_data.get('federation') or player_data.get('federation_code', 'N/A'), col2)
         metric_card(localization_data['player_rank'], player_data.get('world_rank', 'N/A') if player_data.get('world_rank') else "-", col2)
 
         b_year = player_data.get('b_year', 'N/A')
@@ -156,23 +167,27 @@ def displayPlayerLast3Tournaments(player_games_history, localization_data):
         st.write(localization_data['insufficient_data'])
         return
 
-    # Convert result to float and date to datetime format
-    player_games_history['result'] = player_games_history['result'].astype(float)
+    # Convert date to string format
     player_games_history['date'] = pd.to_datetime(player_games_history['date']).dt.strftime('%Y-%m-%d')
 
-    # Group games by tournament name and date
-    tournament_summary = player_games_history.groupby(['tournament_name', 'date']).agg({
-        'opponent_rating': 'mean',  # Average opponent rating
-        'result': ['sum', 'count']  # Sum of results to calculate points and count for number of games
-    }).reset_index()
+    # Group games by tournament name and date: games and points count every game; average opponent rating and
+    # performance only the rated games, as in the FIDE calculation (a tournament without them keeps its row)
+    keys = ['tournament_name', 'date']
+    tournament_summary = player_games_history.groupby(keys, sort=False).agg(
+        games=('result', 'size'),
+        points=('result', 'sum'),
+    ).reset_index()
+    rated_summary = tournamentPerformance(player_games_history, keys)[keys + ['opponent_average', 'performance']]
+    tournament_summary = tournament_summary.merge(rated_summary, on=keys, how='left')
 
     # Rename columns to reflect aggregated metrics
     tournament_summary.columns = [
         localization_data['tournament_name'], 
         localization_data['date'], 
-        localization_data['avg_opponent_rating'], 
+        localization_data['games_played'],
         localization_data['points'],
-        localization_data['games_played']
+        localization_data['avg_opponent_rating'], 
+        localization_data['performance_rating']
     ]
     
     # Calculate overall performance in the tournament as a string (e.g., "6/7")
@@ -187,7 +202,9 @@ def displayPlayerLast3Tournaments(player_games_history, localization_data):
     latest_3_tournaments = tournament_summary.head(3)
 
     # Format 'Avg Opponent Rating' column to two decimal places
-    latest_3_tournaments[localization_data['avg_opponent_rating']] = latest_3_tournaments[localization_data['avg_opponent_rating']].apply(lambda x: int(x))
+    # Torneio so contra oponentes sem rating: sem media nem performance
+    latest_3_tournaments[localization_data['avg_opponent_rating']] = latest_3_tournaments[localization_data['avg_opponent_rating']].apply(lambda x: '-' if pd.isna(x) else int(x))
+    latest_3_tournaments[localization_data['performance_rating']] = latest_3_tournaments[localization_data['performance_rating']].apply(lambda x: '-' if pd.isna(x) else int(x))
     latest_3_tournaments.reset_index(inplace=True, drop=True)
     latest_3_tournaments.index += 1
     
@@ -203,7 +220,7 @@ def displayPlayerLast3Tournaments(player_games_history, localization_data):
     # Display the table with increased font size
     st.markdown(
         latest_3_tournaments[
-            [localization_data['date'], localization_data['tournament_name'], localization_data['avg_opponent_rating'], localization_data['tournament_result']]
+            [localization_data['date'], localization_data['tournament_name'], localization_data['avg_opponent_rating'], localization_data['tournament_result'], localization_data['performance_rating']]
         ].to_html(classes='fontIncrease'), unsafe_allow_html=True
     )
     st.write(" ")
@@ -291,9 +308,6 @@ def displayPlayerGamesHistory(player_games_history, localization_data):
         st.write(localization_data['insufficient_data'])
         return
 
-    # Garantir que colunas numéricas sejam do tipo numérico
-    player_games_history['result'] = pd.to_numeric(player_games_history['result'], errors='coerce')
-
     # Aplicar filtros
     filtered_games_history = player_games_history.copy()  # Criar uma cópia para evitar modificar o DataFrame original
     filtered_games_history.sort_values('date', ascending=False, inplace=True)
@@ -377,8 +391,11 @@ def displayAd(lang='pt'):
         st.sidebar.write("---")  # Draws a horizontal line for visual separation
     
 def displayDownloadDbButton():
-    # Caminho para o seu banco de dados SQLite
-    caminho_db = './database/fide_data.db'
+    # Caminho para o seu banco de dados SQLite; o WAL e copiado para o arquivo antes do download
+    database = get_database()
+    caminho_db = database.db_path
+    if os.path.isfile(caminho_db):
+        database.checkpoint()
 
     # Verificar se o arquivo existe para evitar erros
     if os.path.isfile(caminho_db):
@@ -5,7 +5,6 @@ import matplotlib.pyplot as plt
 def plot_rating_time_series(games_df, localization_data):
     if not games_df.empty:
         games_df['date'] = pd.to_datetime(games_df['date'])
-        games_df['player_rating'] = pd.to_numeric(games_df['player_rating'], errors='coerce')
         games_df.sort_values('date', inplace=True)
 
         plt.figure(figsize=(10, 4))